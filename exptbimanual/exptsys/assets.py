@@ -0,0 +1,193 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Image loading pipeline:
+  1. worker threads read and hash each file, then either map its display-format pixels back
+     in from the on-disk cache or decode it with pygame.image.load (which releases the GIL)
+  2. the main thread converts freshly decoded images to the display's pixel format
+     (convert() for opaque images, convert_alpha() otherwise)
+  3. converted pixels are written back to the cache (in the workers), keyed by content hash
+     and display format, so the next launch skips decoding and conversion altogether
+"""
+
+import hashlib
+import io
+import mmap
+import os
+import shutil
+import struct
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+import pygame
+from platformdirs import user_cache_dir
+
+CACHE_DIR = Path(user_cache_dir("exptbimanual"), "assets")
+
+# magic, width, height, pitch, bitsize, flags, rmask, gmask, bmask, amask
+_HEADER = struct.Struct("<4s5I4I")
+_MAGIC = b"EBPX"
+
+
+@dataclass
+class DecodedImage:
+    path: Path
+    key: str
+    surface: pygame.Surface
+    from_cache: bool
+
+
+def display_formats() -> Optional[dict[bool, tuple]]:
+    """
+    (bitsize, flags, masks) that convert() (False) and convert_alpha() (True) produce for the current display,
+    or None if no display mode has been set yet.
+    """
+    if pygame.display.get_surface() is None:
+        return None
+    sample = pygame.Surface((1, 1), pygame.SRCALPHA)
+    formats = {}
+    for alpha, converted in ((False, sample.convert()), (True, sample.convert_alpha())):
+        formats[alpha] = (converted.get_bitsize(), converted.get_flags() & pygame.SRCALPHA, converted.get_masks())
+    return formats
+
+
+def _is_opaque(surface: pygame.Surface) -> bool:
+    return not (surface.get_flags() & pygame.SRCALPHA) and surface.get_colorkey() is None
+
+
+def _cache_file(key: str, fmt: tuple) -> Path:
+    bitsize, flags, masks = fmt
+    fmt_tag = hashlib.blake2b(repr((bitsize, flags, masks)).encode(), digest_size=4).hexdigest()
+    return CACHE_DIR / f"{key}.{fmt_tag}.px"
+
+
+def _read_cached(cache_file: Path) -> Optional[pygame.Surface]:
+    """
+    Map a cached pixel file and copy its pixels straight into a new surface of the stored format.
+    Returns None if the file is missing or unusable.
+    """
+    try:
+        with open(cache_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, width, height, pitch, bitsize, flags, *masks = _HEADER.unpack_from(mm)
+            if magic != _MAGIC:
+                return None
+            surface = pygame.Surface((width, height), flags, bitsize, masks)
+            if surface.get_pitch() != pitch or len(mm) != _HEADER.size + pitch * height:
+                return None
+            surface.get_buffer().write(mm[_HEADER.size :])
+            return surface
+    except (OSError, ValueError, struct.error, pygame.error):
+        return None
+
+
+def _write_cached(cache_file: Path, surface: pygame.Surface, pixels: bytes):
+    header = _HEADER.pack(
+        _MAGIC,
+        surface.get_width(),
+        surface.get_height(),
+        surface.get_pitch(),
+        surface.get_bitsize(),
+        surface.get_flags() & pygame.SRCALPHA,
+        *surface.get_masks(),
+    )
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so a crash never leaves a truncated cache entry behind
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_file.write_bytes(header + pixels)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass  # the cache is only an optimization
+
+
+def decode_image(path: Path | str, formats: Optional[dict[bool, tuple]], use_cache: bool = True) -> DecodedImage:
+    """
+    First half of the pipeline, safe to run in a worker thread. formats comes from display_formats(),
+    which must be called on the main thread.
+    """
+    path = Path(path)
+    data = path.read_bytes()
+    key = hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    if use_cache and formats is not None:
+        # we don't know yet whether the image is opaque, so check both formats
+        for fmt in formats.values():
+            surface = _read_cached(_cache_file(key, fmt))
+            if surface is not None:
+                return DecodedImage(path, key, surface, from_cache=True)
+
+    surface = pygame.image.load(io.BytesIO(data), path.name)
+    return DecodedImage(path, key, surface, from_cache=False)
+
+
+def finalize_image(
+    item: DecodedImage,
+    formats: Optional[dict[bool, tuple]],
+    use_cache: bool = True,
+    executor: Optional[Executor] = None,
+) -> pygame.Surface:
+    """
+    Second half of the pipeline, must run on the main thread: converts a freshly decoded image to the display's
+    pixel format and stores the converted pixels in the cache (on executor, if given).
+    """
+    if item.from_cache or formats is None:
+        return item.surface
+
+    opaque = _is_opaque(item.surface)
+    surface = item.surface.convert() if opaque else item.surface.convert_alpha()
+
+    if use_cache:
+        cache_args = (_cache_file(item.key, formats[not opaque]), surface, surface.get_buffer().raw)
+        if executor is None:
+            _write_cached(*cache_args)
+        else:
+            executor.submit(_write_cached, *cache_args)
+
+    return surface
+
+
+def load_images(
+    paths: Iterable[Path | str], workers: Optional[int] = None, use_cache: bool = True
+) -> dict[str, pygame.Surface]:
+    """
+    Load images in parallel and return them in the display's pixel format, keyed by file stem.
+    Opaque images (e.g., grayscale BMPs) are converted with convert(), anything with transparency
+    with convert_alpha(). If no display mode has been set, images are returned unconverted and not cached.
+    Converted pixels are cached under the user cache dir, so warm starts only copy memory-mapped pixels.
+    """
+    formats = display_formats()
+
+    with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as pool:
+        decoded = pool.map(lambda path: decode_image(path, formats, use_cache), paths)
+        # conversion needs the display, so it happens here on the calling (main) thread as results arrive
+        return {item.path.stem: finalize_image(item, formats, use_cache, pool) for item in decoded}
+
+
+def load_image(path: Path | str, use_cache: bool = True) -> pygame.Surface:
+    """
+    Load a single image through the same pipeline as load_images().
+    """
+    return next(iter(load_images([path], workers=1, use_cache=use_cache).values()))
+
+
+def clear_cache():
+    """
+    Remove all cached pixel files.
+    """
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
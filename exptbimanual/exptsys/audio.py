@@ -0,0 +1,287 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pygame
+import pygame.sndarray
+
+from exptbimanual.exptsys import timing
+
+# posted (with the PlaybackRecord as event.playback) whenever a scheduled sound finishes
+SOUND_DONE = pygame.event.custom_type()
+
+AT_NOW = "now"
+AT_FLIP = "flip"
+
+
+# mixer settings, chosen by configure_mixer() before pygame.init()
+mixer_buffer: Optional[int] = None  # as used by the mixer, see effective_buffer()
+requested_buffer: Optional[int] = None
+
+# pygame never opens the mixer with a smaller buffer than this
+MIN_BUFFER = 256
+
+
+def effective_buffer(buffer: int) -> int:
+    """
+    The buffer (samples) the mixer really uses for a requested one: pygame rounds it up to a power of two,
+    and to at least MIN_BUFFER, e.g. 300 -> 512, 128 -> 256.
+    """
+    return max(MIN_BUFFER, 1 << (max(1, buffer) - 1).bit_length())
+
+
+def configure_mixer(frequency: int = 48000, size: int = -16, channels: int = 2, buffer: int = 256):
+    """
+    Pre-initialise the mixer with a small buffer so that playback starts with little (and known) latency.
+    Must be called before pygame.init() / pygame.mixer.init(), which otherwise choose a large default buffer.
+    """
+    global mixer_buffer, requested_buffer
+    requested_buffer = buffer
+    mixer_buffer = effective_buffer(buffer)
+    pygame.mixer.pre_init(frequency=frequency, size=size, channels=channels, buffer=mixer_buffer)
+
+
+def mixer_info() -> dict:
+    """
+    The mixer's actual settings and the latency added by its buffer, for the session record.
+    """
+    init = pygame.mixer.get_init()
+    if not init:
+        return {"initialized": False}
+    frequency, size, channels = init
+    return {
+        "initialized": True,
+        "frequency": frequency,
+        "size": size,
+        "channels": channels,
+        "buffer": mixer_buffer,
+        "requested_buffer": requested_buffer,
+        "buffer_latency_ms": (mixer_buffer / frequency * 1000) if mixer_buffer else None,
+    }
+
+
+@dataclass
+class PlaybackRecord:
+    sound: pygame.mixer.Sound
+    volume: float
+    at: str | float  # "now", "flip", or a session time in ms (timing.now())
+    on_done: Optional[Callable[["PlaybackRecord"], None]] = None
+    label: str = ""
+    channel: Optional[pygame.mixer.Channel] = None
+    started: Optional[float] = None  # session ms when Channel.play() was called
+    onset: Optional[float] = None  # estimated session ms when sound reached the output (started + buffer latency)
+    finished: Optional[float] = None  # session ms when playback was seen to have finished
+    cancelled: bool = False  # True if it was never played, see AudioScheduler.cancel_flip()
+
+
+class AudioScheduler:
+    """
+    Fire-and-forget sound playback on reserved mixer channels, so sounds never block the frame loop.
+
+        scheduler.play(sound)                        # start now
+        scheduler.play(sound, at="flip")             # start right after the next display.flip()
+        scheduler.play(sound, at=t_ms, on_done=cb)   # start at t_ms, call cb(record) when it ends
+
+    The runner calls update() once per frame (starts due sounds, reports finished ones) and on_flip() after
+    every flip. Finished sounds are reported through on_done and a SOUND_DONE pygame event.
+    """
+
+    def __init__(self, reserved_channels: int = 4):
+        self.reserved_channels = reserved_channels
+        self.log: list[PlaybackRecord] = []  # every playback started this session, in order
+        self._latency_ms: Optional[float] = None
+        self._channels: list[pygame.mixer.Channel] = []
+        self._waiting: list[PlaybackRecord] = []
+        self._playing: list[PlaybackRecord] = []
+
+    def _ensure_channels(self):
+        if not self._channels:
+            # reserved channels are never picked by Sound.play(), so other playback can't steal them
+            if pygame.mixer.get_num_channels() < self.reserved_channels:
+                pygame.mixer.set_num_channels(self.reserved_channels)
+            pygame.mixer.set_reserved(self.reserved_channels)
+            self._channels = [pygame.mixer.Channel(i) for i in range(self.reserved_channels)]
+            self._latency_ms = mixer_info().get("buffer_latency_ms")
+
+    def play(
+        self,
+        sound: pygame.mixer.Sound,
+        volume: float = 1.0,
+        at: str | float = AT_NOW,
+        on_done: Optional[Callable[[PlaybackRecord], None]] = None,
+        label: str = "",
+    ) -> PlaybackRecord:
+        return self.schedule(PlaybackRecord(sound=sound, volume=volume, at=at, on_done=on_done, label=label))
+
+    def schedule(self, record: PlaybackRecord) -> PlaybackRecord:
+        """
+        Like play(), for a record made beforehand, e.g. so the caller can read its onset once it has played.
+        """
+        if record.at == AT_NOW:
+            self._start(record)
+        else:
+            self._waiting.append(record)
+        return record
+
+    def on_flip(self):
+        """
+        Start everything scheduled for "flip". Called by the runner right after display.flip().
+        """
+        if self._waiting:
+            for record in [record for record in self._waiting if record.at == AT_FLIP]:
+                self._waiting.remove(record)
+                self._start(record)
+
+    def cancel_flip(self) -> list[PlaybackRecord]:
+        """
+        Drop (and return) everything still waiting for a flip. Called by the runner when a loop ends without
+        flipping, so a sound meant for that display doesn't play with the next one instead.
+        """
+        cancelled = [record for record in self._waiting if record.at == AT_FLIP]
+        for record in cancelled:
+            self._waiting.remove(record)
+            record.cancelled = True
+        return cancelled
+
+    def update(self, now: Optional[float] = None):
+        """
+        Start sounds whose time has come and report any that have finished. Called by the runner every frame.
+        """
+        if not (self._waiting or self._playing):
+            return
+        now = timing.now() if now is None else now
+
+        for record in [record for record in self._waiting if record.at != AT_FLIP and record.at <= now]:
+            self._waiting.remove(record)
+            self._start(record)
+
+        for record in [record for record in self._playing if not self.is_playing(record)]:
+            self._playing.remove(record)
+            record.finished = now
+            if record.on_done is not None:
+                record.on_done(record)
+            pygame.event.post(pygame.event.Event(SOUND_DONE, playback=record))
+
+    def stop_all(self):
+        self._waiting.clear()
+        for record in self._playing:
+            record.channel.stop()
+
+    def busy(self) -> bool:
+        return bool(self._waiting or self._playing)
+
+    @staticmethod
+    def is_playing(record: PlaybackRecord) -> bool:
+        if timing.clock.virtual:
+            # the mixer plays in real time, so with simulated time go by the sound's length instead
+            return record.started is not None and timing.now() < record.started + record.sound.get_length() * 1000
+        return record.channel.get_busy() and record.channel.get_sound() is record.sound
+
+    def _start(self, record: PlaybackRecord):
+        self._ensure_channels()
+        # use a free reserved channel, or cut off the sound that has been playing longest
+        channel = next((channel for channel in self._channels if not channel.get_busy()), None)
+        if channel is None:
+            # every reserved channel can be busy with nothing of ours on it, e.g. when the mixer is still
+            # playing a sound that has already ended in simulated time. then just reuse the first channel
+            channel = self._playing[0].channel if self._playing else self._channels[0]
+            channel.stop()
+        channel.set_volume(record.volume)
+        channel.play(record.sound)
+        record.channel = channel
+        record.started = timing.now()
+        record.onset = record.started + (self._latency_ms or 0.0)
+        self._playing.append(record)
+        self.log.append(record)
+
+
+scheduler = AudioScheduler()
+
+
+# --- synthesised tones ---------------------------------------------------------
+
+# mixer sample size (as reported by pygame.mixer.get_init()) -> sample dtype.
+# pygame only opens 32-bit mixers as float, which get_init() reports as -32
+_SAMPLE_TYPES = {8: np.uint8, -8: np.int8, 16: np.uint16, -16: np.int16, -32: np.float32}
+
+
+def tone(
+    frequency: float = 440.0,
+    duration_ms: float = 100.0,
+    waveform: str = "sine",
+    ramp_ms: float = 5.0,
+    volume: float = 1.0,
+) -> pygame.mixer.Sound:
+    """
+    A sine or square tone with raised-cosine onset/offset ramps (to avoid clicks), synthesised at the mixer's
+    sample rate, sample size, and channel count. Tones are cached by their parameters (and the mixer format),
+    so calling this again with the same parameters, e.g. during a block, returns the same Sound instantly.
+    """
+    if not pygame.mixer.get_init():
+        raise pygame.error("The mixer must be initialised before synthesising tones")
+    return _tone(float(frequency), float(duration_ms), waveform, float(ramp_ms), float(volume), pygame.mixer.get_init())
+
+
+def prepare_tones(specs: Iterable[dict]) -> list[pygame.mixer.Sound]:
+    """
+    Synthesise (and cache) every tone a block will need before it starts, e.g.
+    prepare_tones([{"frequency": 880, "duration_ms": 150}, {"frequency": 220, "duration_ms": 150}])
+    """
+    return [tone(**spec) for spec in specs]
+
+
+@lru_cache(maxsize=64)
+def _tone(
+    frequency: float, duration_ms: float, waveform: str, ramp_ms: float, volume: float, mixer_format: tuple
+) -> pygame.mixer.Sound:
+    sample_rate, size, channels = mixer_format
+    n_samples = max(1, round(sample_rate * duration_ms / 1000))
+    t = np.arange(n_samples) / sample_rate
+
+    if waveform == "sine":
+        wave = np.sin(2 * np.pi * frequency * t)
+    elif waveform == "square":
+        wave = np.where(np.sin(2 * np.pi * frequency * t) >= 0, 1.0, -1.0)
+    else:
+        raise ValueError(f'Unknown waveform "{waveform}", expected "sine" or "square"')
+
+    n_ramp = min(round(sample_rate * ramp_ms / 1000), n_samples // 2)
+    if n_ramp:
+        ramp = 0.5 * (1 - np.cos(np.pi * np.arange(n_ramp) / n_ramp))
+        wave[:n_ramp] *= ramp
+        wave[n_samples - n_ramp :] *= ramp[::-1]
+
+    wave *= max(0.0, min(1.0, volume))
+
+    dtype = _SAMPLE_TYPES[size]
+    if np.issubdtype(dtype, np.floating):
+        samples = wave.astype(dtype)
+    else:
+        info = np.iinfo(dtype)
+        half_range = (int(info.max) - int(info.min)) / 2
+        midpoint = (int(info.max) + int(info.min) + 1) / 2  # 0 for signed, e.g. 32768 for uint16
+        samples = np.round(midpoint + wave * (half_range - 1)).astype(dtype)
+
+    if channels > 1:
+        samples = np.repeat(samples[:, np.newaxis], channels, axis=1)
+
+    return pygame.sndarray.make_sound(np.ascontiguousarray(samples))
@@ -0,0 +1,108 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+import re
+import threading
+import zipfile
+from pathlib import Path
+from queue import Full, Queue
+from typing import Optional
+
+import pygame
+
+from exptbimanual.exptsys.datasink import unused_path
+
+
+class FrameCapture:
+    """
+    Records what was drawn for stimulus auditing. capture() is called by the runner with the first frame of
+    each loop. On the main thread it only copies the frame into a bounded queue (dropping the frame rather
+    than waiting if the queue is full). Downsampling and PNG encoding happen on a background thread.
+
+    Frames are written as numbered PNGs to the folder directory/name, or, with archive=True, into a single
+    directory/name.zip archive (one PNG per frame, in presentation order). If that folder or archive already
+    exists (e.g., from an earlier run), name-2, name-3, etc. is used instead, so earlier captures are kept.
+    """
+
+    def __init__(
+        self,
+        directory: Path | str,
+        scale: float = 1.0,
+        max_queue: int = 32,
+        archive: bool = False,
+        name: str = "frames",
+    ):
+        self.directory = Path(directory)
+        self.scale = scale
+        self.archive = archive
+        self.name = name
+        self.target: Optional[Path] = None  # archive or folder actually written to, chosen on the first capture
+        self.captured = 0
+        self.dropped = 0
+        self._queue: Queue = Queue(maxsize=max_queue)
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def capture(self, screen: pygame.Surface, label: str):
+        if self._thread is None:
+            self._start()
+        index = self.captured + self.dropped
+        try:
+            self._queue.put_nowait((index, label, screen.copy()))
+            self.captured += 1
+        except Full:
+            self.dropped += 1
+
+    def close(self):
+        """
+        Wait for queued frames to be written, then stop the background thread.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def _start(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.archive:
+            self.target = unused_path(self.directory / f"{self.name}.zip")
+            self._zip = zipfile.ZipFile(self.target, "x", compression=zipfile.ZIP_STORED)
+        else:
+            self.target = unused_path(self.directory / self.name)
+            self.target.mkdir(parents=True)
+        self._thread = threading.Thread(target=self._writer, name="frame-capture", daemon=True)
+        self._thread.start()
+
+    def _writer(self):
+        while (item := self._queue.get()) is not None:
+            index, label, frame = item
+            if self.scale != 1.0:
+                size = (max(1, round(frame.get_width() * self.scale)), max(1, round(frame.get_height() * self.scale)))
+                frame = pygame.transform.smoothscale(frame, size)
+            name = f"{index:06d}_{re.sub(r'[^A-Za-z0-9_.-]', '_', label)}.png"
+            if self._zip is not None:
+                buffer = io.BytesIO()
+                pygame.image.save(frame, buffer, name)
+                self._zip.writestr(name, buffer.getvalue())
+            else:
+                pygame.image.save(frame, str(self.target / name))
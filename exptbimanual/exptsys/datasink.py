@@ -0,0 +1,154 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import csv
+import json
+import os
+import threading
+from pathlib import Path
+from queue import Queue
+from typing import Any, Optional
+
+import numpy as np
+
+# sinks that haven't been closed yet, so they can all be flushed on the way out (see close_all())
+open_sinks: list["DataSink"] = []
+
+
+def session_file(directory: Path | str, prefix: str, subid: Any, session: Any, suffix: str = ".csv") -> Path:
+    """
+    directory/prefix_subid_session.suffix, or prefix_subid_session-2.suffix etc. if that already exists,
+    so an earlier run's data is never appended to or overwritten.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    return unused_path(directory / f"{prefix}_{subid}_{session}{suffix}")
+
+
+def unused_path(path: Path | str) -> Path:
+    """
+    path, or path with -2, -3, etc. added to its stem if that already exists (file or directory).
+    """
+    path = Path(path)
+    candidate = path
+    n = 2
+    while candidate.exists():
+        candidate = path.with_name(f"{path.stem}-{n}{path.suffix}")
+        n += 1
+    return candidate
+
+
+def _plain(value: Any) -> Any:
+    # numpy scalars and arrays (e.g., from a TrialTable) as plain Python values
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+def save_json(path: Path | str, data: dict) -> Path:
+    """
+    Write data (e.g., session settings) as JSON, fsynced, replacing the file in one step so it's never left
+    half-written.
+    """
+    path = Path(path)
+    temp = path.with_name(path.name + ".tmp")
+    with open(temp, "w", encoding="utf-8") as file:
+        json.dump({key: _plain(value) for key, value in data.items()}, file, indent=2, default=str)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp, path)
+    return path
+
+
+class DataSink:
+    """
+    Appends one record (a dict) per write() to a CSV or JSONL file (chosen by the path's suffix).
+    write() only queues the record. A background thread writes each record, flushes it and fsyncs it,
+    so a crash or Ctrl+X loses at most the record being written and the frame loop never waits on the disk.
+
+    CSV columns are those of the first record. Keys that first appear in later records are left out,
+    so use JSONL for records whose keys vary.
+    """
+
+    def __init__(self, path: Path | str, fsync: bool = True):
+        self.path = Path(path)
+        self.fsync = fsync
+        self.queued = 0
+        self.written = 0
+        self.errors: list[str] = []
+        self._queue: Queue = Queue()
+        self._thread = threading.Thread(target=self._writer, name=f"data-sink-{self.path.name}", daemon=True)
+        self._thread.start()
+        open_sinks.append(self)
+
+    @property
+    def ok(self) -> bool:
+        """
+        True if nothing has failed and every record queued so far has been written (once closed, all of them).
+        """
+        return not self.errors and self.written == self.queued
+
+    def write(self, record: dict):
+        self.queued += 1
+        self._queue.put({key: _plain(value) for key, value in record.items()})
+
+    def close(self) -> bool:
+        """
+        Wait for queued records to be written, then stop the background thread.
+        Returns ok, so callers can tell the experimenter when data was lost (see errors).
+        """
+        if self in open_sinks:
+            open_sinks.remove(self)
+            self._queue.put(None)
+            self._thread.join()
+        return self.ok
+
+    def _writer(self):
+        csv_writer: Optional[csv.DictWriter] = None
+        try:
+            file = open(self.path, "a", newline="", encoding="utf-8")
+        except OSError as e:
+            # nothing can be written, but keep the error so close() reports it
+            self.errors.append(f"{type(e).__name__}: {e}")
+            return
+        with file:
+            while (record := self._queue.get()) is not None:
+                try:
+                    if self.path.suffix.lower() == ".csv":
+                        if csv_writer is None:
+                            csv_writer = csv.DictWriter(file, fieldnames=list(record), extrasaction="ignore")
+                            if file.tell() == 0:
+                                csv_writer.writeheader()
+                        csv_writer.writerow(record)
+                    else:
+                        file.write(json.dumps(record, default=str) + "\n")
+                    file.flush()
+                    if self.fsync:
+                        os.fsync(file.fileno())
+                    self.written += 1
+                except (OSError, ValueError, TypeError) as e:
+                    self.errors.append(f"{type(e).__name__}: {e}")
+
+
+def close_all() -> list["DataSink"]:
+    """
+    Close every open sink, e.g. at shutdown, so nothing still queued is lost. Returns the sinks that lost data.
+    """
+    return [sink for sink in list(open_sinks) if not sink.close()]
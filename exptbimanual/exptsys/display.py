@@ -0,0 +1,217 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import statistics
+import warnings
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Iterator, Optional
+
+import pygame
+
+# measured flip rates outside this range mean flips aren't really waiting for the display (e.g., dummy driver)
+MIN_REFRESH_HZ = 20
+MAX_REFRESH_HZ = 500
+
+
+@dataclass(frozen=True)
+class ModeRequest:
+    fullscreen: bool = False
+    scaled: bool = False
+    vsync: bool = False
+    doublebuf: bool = False
+
+    @property
+    def flags(self) -> int:
+        flags = 0
+        if self.fullscreen:
+            flags |= pygame.FULLSCREEN
+        if self.scaled:
+            flags |= pygame.SCALED
+        if self.doublebuf:
+            flags |= pygame.DOUBLEBUF
+        return flags
+
+    def __str__(self) -> str:
+        names = [name for name in ("fullscreen", "scaled", "vsync", "doublebuf") if getattr(self, name)]
+        return "+".join(names) or "windowed"
+
+
+@dataclass
+class DisplayMode:
+    """
+    What was actually opened, and how it behaves. Meant to be stored with the session data.
+    """
+
+    size: tuple[int, int]
+    requested: str
+    mode: str  # the mode that was opened, may differ from requested if fallbacks were needed
+    fullscreen: bool
+    scaled: bool
+    vsync: bool
+    doublebuf: bool
+    driver: str
+    reported_refresh_hz: Optional[int]
+    refresh_interval_ms: Optional[float]  # median flip-to-flip interval
+    refresh_hz: Optional[float]
+    flip_cost_ms: Optional[float]  # median time spent inside display.flip()
+    vsync_effective: bool  # vsync was requested and flips actually wait for a plausible refresh interval
+    fallbacks: list[str] = field(default_factory=list)  # modes that were tried first and why they failed
+    probed_refresh_hz: Optional[float] = None  # measured with a vsync probe window, see probe_refresh()
+
+    @property
+    def frame_period_ms(self) -> Optional[float]:
+        """
+        The display's refresh period, from the best source available: flips measured with working vsync,
+        the desktop's reported rate, or a vsync probe. None if it's unknown.
+        """
+        if self.vsync_effective:
+            return self.refresh_interval_ms
+        if self.reported_refresh_hz:
+            return 1000 / self.reported_refresh_hz
+        if self.probed_refresh_hz:
+            return 1000 / self.probed_refresh_hz
+        return None
+
+
+def _candidates(request: ModeRequest) -> Iterator[ModeRequest]:
+    """
+    The requested mode, followed by progressively simpler modes to fall back on.
+    """
+    fullscreen, scaled, vsync, doublebuf = request.fullscreen, request.scaled, request.vsync, request.doublebuf
+    yield request
+    if vsync and not scaled:
+        # without OpenGL, pygame can only give us vsync through the SCALED renderer
+        yield ModeRequest(fullscreen, True, vsync, doublebuf)
+    if vsync:
+        yield ModeRequest(fullscreen, scaled, False, doublebuf)
+    if fullscreen:
+        yield ModeRequest(False, scaled, False, doublebuf)
+    yield ModeRequest()
+
+
+def _reported_refresh_hz() -> Optional[int]:
+    # only pygame-ce has get_desktop_refresh_rates(), pygame itself can't report the rate
+    try:
+        rates = pygame.display.get_desktop_refresh_rates()
+        return rates[0] if rates and rates[0] else None
+    except (AttributeError, pygame.error):
+        return None
+
+
+def measure_refresh(frames: int = 60, warmup: int = 10) -> tuple[Optional[float], Optional[float]]:
+    """
+    Flip the (blank) display repeatedly and return the median (flip-to-flip interval, flip cost) in ms.
+    Without vsync the interval is only as long as the flip itself.
+    """
+    if frames < 2 or pygame.display.get_surface() is None:
+        return None, None
+
+    screen = pygame.display.get_surface()
+    flip_starts, flip_costs = [], []
+    for i in range(warmup + frames):
+        screen.fill("black")
+        pygame.event.pump()
+        start = perf_counter()
+        pygame.display.flip()
+        end = perf_counter()
+        if i >= warmup:
+            flip_starts.append(end)
+            flip_costs.append((end - start) * 1000)
+
+    intervals = [(b - a) * 1000 for a, b in zip(flip_starts, flip_starts[1:])]
+    return statistics.median(intervals), statistics.median(flip_costs)
+
+
+def probe_refresh(size: tuple[int, int], frames: int = 60) -> Optional[float]:
+    """
+    Refresh rate (Hz) measured by flipping a briefly opened SCALED+vsync window, for when the mode to be used
+    has no vsync and the desktop's rate can't be reported. None if vsync isn't available or flips don't wait
+    for a plausible refresh (e.g., the dummy driver). Must be called before the real mode is opened.
+    """
+    try:
+        with warnings.catch_warnings():
+            # e.g. "no fast renderer available", which just means no vsync
+            warnings.simplefilter("ignore")
+            pygame.display.set_mode(size, pygame.SCALED, vsync=1)
+    except pygame.error:
+        return None
+    interval, _ = measure_refresh(frames)
+    # a SCALED renderer can't always be switched to another mode, so start the display over
+    pygame.display.quit()
+    pygame.display.init()
+    refresh_hz = (1000 / interval) if interval else None
+    return refresh_hz if refresh_hz and MIN_REFRESH_HZ <= refresh_hz <= MAX_REFRESH_HZ else None
+
+
+def open_display(
+    size: tuple[int, int],
+    fullscreen: bool = False,
+    scaled: bool = False,
+    vsync: bool = False,
+    doublebuf: bool = False,
+    measure_frames: int = 60,
+    probe: bool = True,
+) -> tuple[pygame.Surface, DisplayMode]:
+    """
+    Open the requested display mode, falling back to simpler modes when it isn't available,
+    then measure the refresh interval and flip cost of whatever was opened.
+    Without vsync, flips say nothing about the refresh rate, so if it isn't reported either (and probe is True),
+    it's measured first with probe_refresh().
+    """
+    request = ModeRequest(fullscreen, scaled, vsync, doublebuf)
+    reported_refresh_hz = _reported_refresh_hz()
+    probed_refresh_hz = probe_refresh(size, measure_frames) if probe and not vsync and not reported_refresh_hz else None
+
+    fallbacks: list[str] = []
+    screen, opened = None, None
+    tried = set()
+    for candidate in _candidates(request):
+        if candidate in tried:
+            continue
+        tried.add(candidate)
+        try:
+            screen = pygame.display.set_mode(size, candidate.flags, vsync=int(candidate.vsync))
+            opened = candidate
+            break
+        except pygame.error as e:
+            fallbacks.append(f"{candidate}: {e}")
+
+    if screen is None:
+        raise pygame.error(f"Unable to open any display mode ({'; '.join(fallbacks)})")
+
+    interval, flip_cost = measure_refresh(measure_frames)
+    refresh_hz = (1000 / interval) if interval else None
+
+    return screen, DisplayMode(
+        size=screen.get_size(),
+        requested=str(request),
+        mode=str(opened),
+        fullscreen=opened.fullscreen,
+        scaled=opened.scaled,
+        vsync=opened.vsync,
+        doublebuf=opened.doublebuf,
+        driver=pygame.display.get_driver(),
+        reported_refresh_hz=reported_refresh_hz,
+        refresh_interval_ms=interval,
+        refresh_hz=refresh_hz,
+        flip_cost_ms=flip_cost,
+        vsync_effective=bool(opened.vsync and refresh_hz and MIN_REFRESH_HZ <= refresh_hz <= MAX_REFRESH_HZ),
+        fallbacks=fallbacks,
+        probed_refresh_hz=probed_refresh_hz,
+    )
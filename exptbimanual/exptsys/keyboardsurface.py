@@ -38,58 +38,131 @@ KEY_SPACING = 10
 MARGIN = 20
 FONT_SIZE = 28
 
+BACKGROUND_COLOR = (30, 30, 30)
+KEY_COLOR = (200, 200, 200)
+TEXT_COLOR = (0, 0, 0)
+BORDER_COLOR = (0, 0, 0)
 
-@lru_cache(20)
-def keyboard_surface(keys_to_highlight: str, highlight_color: tuple = (100, 255, 100)) -> pygame.Surface:
-    pygame.init()
-    font = pygame.font.SysFont("Arial", FONT_SIZE)
 
+def _layout() -> tuple[tuple[int, int], dict[str, pygame.Rect], dict[str, str]]:
+    """
+    Compute the keyboard geometry once: overall (width, height), a rect for each key
+    (in unscaled keyboard coordinates), and the label drawn on each key.
+    """
     rows = len(KEY_LAYOUT) + 1  # +1 for spacebar
     cols = max(len(row) for row in KEY_LAYOUT)
     surface_width = MARGIN * 2 + cols * (KEY_WIDTH + KEY_SPACING) - KEY_SPACING
     surface_height = MARGIN * 2 + rows * (KEY_HEIGHT + KEY_SPACING) - KEY_SPACING
 
-    surface = pygame.Surface((surface_width, surface_height))
-    surface.fill((30, 30, 30))
-
-    key_color = (200, 200, 200)
-    text_color = (0, 0, 0)
-
-    keys_to_highlight = {k.upper() for k in keys_to_highlight.split(" ")}
-
+    rects: dict[str, pygame.Rect] = {}
+    labels: dict[str, str] = {}
     for row_idx, row in enumerate(KEY_LAYOUT):
         offset = (cols - len(row)) * (KEY_WIDTH + KEY_SPACING) // 2  # center short rows
         for col_idx, key in enumerate(row):
             x = MARGIN + offset + col_idx * (KEY_WIDTH + KEY_SPACING)
             y = MARGIN + row_idx * (KEY_HEIGHT + KEY_SPACING)
+            rects[key.upper()] = pygame.Rect(x, y, KEY_WIDTH, KEY_HEIGHT)
+            labels[key.upper()] = key.upper()
 
-            rect = pygame.Rect(x, y, KEY_WIDTH, KEY_HEIGHT)
-            color = highlight_color if key.upper() in keys_to_highlight else key_color
-            pygame.draw.rect(surface, color, rect, border_radius=8)
-            pygame.draw.rect(surface, (0, 0, 0), rect, width=2, border_radius=8)
-
-            text = font.render(key.upper(), True, text_color)
-            text_rect = text.get_rect(center=rect.center)
-            surface.blit(text, text_rect)
-
-    # Draw spacebar on final row
+    # spacebar on final row
     spacebar_row = len(KEY_LAYOUT)
     spacebar_width = SPECIAL_KEYS["SPACE"]["width"] * KEY_WIDTH + (SPECIAL_KEYS["SPACE"]["width"] - 1) * KEY_SPACING
     spacebar_x = (surface_width - spacebar_width) // 2
     spacebar_y = MARGIN + spacebar_row * (KEY_HEIGHT + KEY_SPACING)
+    rects["SPACE"] = pygame.Rect(spacebar_x, spacebar_y, spacebar_width, KEY_HEIGHT)
+    labels["SPACE"] = SPECIAL_KEYS["SPACE"]["label"]
+
+    return (surface_width, surface_height), rects, labels
+
+
+KEYBOARD_SIZE, KEY_RECTS, KEY_LABELS = _layout()
+
+
+def _scaled_rect(rect: pygame.Rect, scale: float) -> pygame.Rect:
+    """
+    Scale rect edges (rather than size) so that neighbouring scaled tiles line up exactly with the scaled base.
+    """
+    left, top = round(rect.left * scale), round(rect.top * scale)
+    return pygame.Rect(left, top, round(rect.right * scale) - left, round(rect.bottom * scale) - top)
+
 
-    spacebar_rect = pygame.Rect(spacebar_x, spacebar_y, spacebar_width, KEY_HEIGHT)
-    color = highlight_color if "SPACE" in keys_to_highlight else key_color
-    pygame.draw.rect(surface, color, spacebar_rect, border_radius=8)
-    pygame.draw.rect(surface, (0, 0, 0), spacebar_rect, width=2, border_radius=8)
+def _display_format(surface: pygame.Surface) -> pygame.Surface:
+    # converting is only possible once a display mode has been set
+    return surface.convert() if pygame.display.get_surface() is not None else surface
 
-    text = font.render("Space", True, text_color)
-    text_rect = text.get_rect(center=spacebar_rect.center)
-    surface.blit(text, text_rect)
 
+@lru_cache(maxsize=1)
+def _font() -> pygame.font.Font:
+    if not pygame.font.get_init():
+        pygame.font.init()
+    return pygame.font.SysFont("Arial", FONT_SIZE)
+
+
+@lru_cache(maxsize=None)
+def _key_tile(key: str, color: tuple, scale: float = 1.0) -> pygame.Surface:
+    """
+    Render a single key (background, rounded rect, border, and label) as a tile the size of its rect.
+    Tiles are cached per key, color, and scale, so each one is rendered exactly once.
+    """
+    if scale != 1.0:
+        return _display_format(
+            pygame.transform.smoothscale(_key_tile(key, color), _scaled_rect(KEY_RECTS[key], scale).size)
+        )
+
+    tile = pygame.Surface(KEY_RECTS[key].size)
+    tile.fill(BACKGROUND_COLOR)
+
+    rect = tile.get_rect()
+    pygame.draw.rect(tile, color, rect, border_radius=8)
+    pygame.draw.rect(tile, BORDER_COLOR, rect, width=2, border_radius=8)
+
+    text = _font().render(KEY_LABELS[key], True, TEXT_COLOR)
+    tile.blit(text, text.get_rect(center=rect.center))
+
+    return _display_format(tile)
+
+
+@lru_cache(maxsize=None)
+def _base_keyboard(scale: float = 1.0) -> pygame.Surface:
+    """
+    The full keyboard with no keys highlighted, composed from the normal key tiles.
+    """
+    width, height = KEYBOARD_SIZE
+    surface = pygame.Surface((round(width * scale), round(height * scale)))
+    surface.fill(BACKGROUND_COLOR)
+    surface.blits(
+        [(_key_tile(key, KEY_COLOR, scale), _scaled_rect(rect, scale)) for key, rect in KEY_RECTS.items()],
+        doreturn=False,
+    )
+    return _display_format(surface)
+
+
+@lru_cache(maxsize=128)
+def _compose(keys_to_highlight: frozenset[str], highlight_color: tuple, scale: float) -> pygame.Surface:
+    surface = _base_keyboard(scale).copy()
+    surface.blits(
+        [
+            (_key_tile(key, highlight_color, scale), _scaled_rect(KEY_RECTS[key], scale))
+            for key in keys_to_highlight
+            if key in KEY_RECTS
+        ],
+        doreturn=False,
+    )
     return surface
 
 
+def keyboard_surface(
+    keys_to_highlight: str, highlight_color: tuple = (100, 255, 100), scale: float = 1.0
+) -> pygame.Surface:
+    """
+    Return a keyboard image with the space-separated keys in keys_to_highlight (e.g., "A K SPACE") highlighted.
+    The image is a copy of a pre-rendered base keyboard with the cached highlighted key tiles blitted over it,
+    so new highlight sets and scales never re-render fonts. Unknown key names are ignored.
+    """
+    keys = frozenset(k.upper() for k in keys_to_highlight.split(" ") if k)
+    return _compose(keys, tuple(highlight_color), float(scale))
+
+
 if __name__ == "__main__":
     pygame.init()
     screen = pygame.display.set_mode((900, 400))
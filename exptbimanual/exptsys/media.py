@@ -0,0 +1,165 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable
+
+import pygame
+
+from exptbimanual.exptsys.assets import decode_image, display_formats, finalize_image
+
+
+class MediaStore:
+    """
+    Drop-in replacement for a SimpleNamespace of preloaded media, e.g. media.FF1BW or media["FF1BW"].
+
+    Images are registered by name and path, loaded (through exptsys.assets) the first time they are used,
+    and the least-recently-used ones are evicted whenever the loaded images exceed budget_bytes.
+    Anything assigned directly (e.g. media.beep_high = pygame.mixer.Sound(...)) is kept for the whole session.
+    """
+
+    def __init__(self, budget_bytes: int = 256 * 1024 * 1024, use_cache: bool = True):
+        self.budget_bytes = budget_bytes
+        self.use_cache = use_cache
+        self._paths: dict[str, Path] = {}
+        self._loaded: OrderedDict[str, pygame.Surface] = OrderedDict()
+        self._loaded_bytes: int = 0
+        self._resident: dict[str, Any] = {}
+        self._pending: dict[str, Future] = {}
+        self._formats = None
+        self._pool: ThreadPoolExecutor | None = None
+
+    # --- registration --------------------------------------------------------
+
+    def register_image(self, name: str, path: Path | str):
+        self._paths[name] = Path(path)
+
+    def register_images(self, paths: Iterable[Path | str]):
+        """
+        Register each image under its file stem, e.g. .../FF1BW.bmp -> "FF1BW".
+        """
+        for path in paths:
+            self.register_image(Path(path).stem, path)
+
+    # --- access --------------------------------------------------------------
+
+    def __setattr__(self, name: str, value: Any):
+        if name.startswith("_") or name in ("budget_bytes", "use_cache"):
+            object.__setattr__(self, name, value)
+        else:
+            self._resident[name] = value
+
+    def __getattr__(self, name: str) -> Any:
+        # only called when normal attribute lookup fails, i.e., for media names
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(f"No media named {name!r}") from None
+
+    def __getitem__(self, name: str) -> Any:
+        if name in self._resident:
+            return self._resident[name]
+
+        if name in self._loaded:
+            self._loaded.move_to_end(name)
+            return self._loaded[name]
+
+        if name not in self._paths:
+            raise KeyError(name)
+
+        future = self._pending.pop(name, None)
+        if future is not None:
+            decoded = future.result()
+        else:
+            decoded = decode_image(self._paths[name], self._display_formats(), self.use_cache)
+
+        image = finalize_image(decoded, self._display_formats(), self.use_cache, self._pool)
+        self._loaded[name] = image
+        self._loaded_bytes += self._nbytes(image)
+        self._evict(keep=name)
+        return image
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._resident or name in self._paths
+
+    def __dir__(self) -> list[str]:
+        return list(super().__dir__()) + self.keys()
+
+    def keys(self) -> list[str]:
+        return list(self._paths) + list(self._resident)
+
+    # --- memory management ---------------------------------------------------
+
+    @property
+    def loaded_bytes(self) -> int:
+        return self._loaded_bytes
+
+    def loaded_names(self) -> list[str]:
+        """
+        Names of images currently in memory, least recently used first.
+        """
+        return list(self._loaded)
+
+    def prefetch(self, names: Iterable[str]):
+        """
+        Start decoding the named images in the background (e.g., the stimuli for the next block),
+        so that their first use only has to convert them to the display format.
+        """
+        formats = self._display_formats()
+        for name in names:
+            if name in self._loaded or name in self._pending or name not in self._paths:
+                continue
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="media-prefetch")
+            self._pending[name] = self._pool.submit(decode_image, self._paths[name], formats, self.use_cache)
+
+    def evict(self, names: Iterable[str] | None = None):
+        """
+        Drop the named images (default: all loaded images) from memory. They'll be reloaded on next use.
+        """
+        for name in list(self._loaded if names is None else names):
+            image = self._loaded.pop(name, None)
+            if image is not None:
+                self._loaded_bytes -= self._nbytes(image)
+
+    def _evict(self, keep: str):
+        while self._loaded_bytes > self.budget_bytes and len(self._loaded) > 1:
+            name = next(iter(self._loaded))
+            if name == keep:
+                break
+            self.evict([name])
+
+    @staticmethod
+    def _nbytes(image: pygame.Surface) -> int:
+        return image.get_pitch() * image.get_height()
+
+    def _display_formats(self):
+        # the display format can't change mid-session, but may not be known until a display mode is set
+        if self._formats is None:
+            self._formats = display_formats()
+        return self._formats
+
+    def __repr__(self) -> str:
+        return (
+            f"MediaStore(registered={len(self._paths)}, resident={list(self._resident)}, "
+            f"loaded={len(self._loaded)}, loaded_bytes={self._loaded_bytes}, budget_bytes={self.budget_bytes})"
+        )
@@ -0,0 +1,116 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+# the parts of a run_loop() frame, in order. run_loop() takes a perf_counter_ns() stamp before the first
+# and after each one, so a frame has len(PHASES) + 1 stamps
+PHASES = ("events", "audio", "fill", "draw", "input", "capture", "flip", "tick")
+
+STATS = ("mean", "p50", "p95", "p99", "max")
+
+
+def phase_stats(durations_ms: np.ndarray) -> dict[str, dict[str, float]]:
+    """
+    {phase: {"mean": ..., "p50": ..., "p95": ..., "p99": ..., "max": ...}} (plus "frame", the whole frame)
+    for an (n_frames, len(PHASES)) array of phase durations in ms.
+    """
+    if not len(durations_ms):
+        return {}
+    columns = np.column_stack([durations_ms, durations_ms.sum(axis=1)])
+    p50, p95, p99 = np.percentile(columns, [50, 95, 99], axis=0)
+    means, maxes = columns.mean(axis=0), columns.max(axis=0)
+    return {
+        phase: {"mean": means[i], "p50": p50[i], "p95": p95[i], "p99": p99[i], "max": maxes[i]}
+        for i, phase in enumerate(PHASES + ("frame",))
+    }
+
+
+def format_stats(stats: dict[str, dict[str, float]]) -> str:
+    lines = [f"{'phase':<10}" + "".join(f"{stat:>9}" for stat in STATS)]
+    for phase, values in stats.items():
+        lines.append(f"{phase:<10}" + "".join(f"{values[stat]:>9.3f}" for stat in STATS))
+    return "\n".join(lines)
+
+
+class FrameProfiler:
+    """
+    Times each phase of every run_loop() frame (see PHASES), e.g. runner.set_frame_profiler(FrameProfiler()).
+
+    Stamps go into preallocated int64 buffers: one for the current loop and one per display function,
+    each holding the last `capacity` frames, so profiling allocates nothing per frame. Statistics are only
+    computed when a loop ends and when report() is called.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        self.loops: list[tuple[str, int, dict]] = []  # (display function, frames, phase_stats) per loop
+        self._stamps = np.zeros((capacity, len(PHASES) + 1), dtype=np.int64)
+        self._frames = 0
+        self._label = ""
+        self._by_function: dict[str, tuple[np.ndarray, list[int]]] = {}  # name -> (durations, [frames seen])
+
+    def start_loop(self, label: str):
+        self._label = label
+        self._frames = 0
+
+    def next_frame(self) -> np.ndarray:
+        """
+        The stamp row for the frame about to run. A frame counts once its last stamp has been written
+        (see end_frame()), so the frame a loop breaks out of is not included.
+        """
+        return self._stamps[self._frames % self.capacity]
+
+    def end_frame(self):
+        self._frames += 1
+
+    def end_loop(self) -> Optional[dict]:
+        """
+        Statistics for the loop that just ended (None if no frame was completed).
+        """
+        n = min(self._frames, self.capacity)
+        if not n:
+            return None
+        durations = np.diff(self._stamps[:n], axis=1) / 1e6
+
+        buffer, seen = self._by_function.setdefault(self._label, (np.zeros((self.capacity, len(PHASES))), [0]))
+        rows = (seen[0] + np.arange(n)) % self.capacity
+        buffer[rows] = durations
+        seen[0] += n
+
+        stats = phase_stats(durations)
+        self.loops.append((self._label, self._frames, stats))
+        return stats
+
+    def function_stats(self) -> dict[str, dict]:
+        """
+        {display function: phase_stats} over the last `capacity` frames drawn by each display function.
+        """
+        return {
+            name: phase_stats(buffer[: min(seen[0], self.capacity)])
+            for name, (buffer, seen) in self._by_function.items()
+        }
+
+    def report(self) -> str:
+        sections = []
+        for name, stats in self.function_stats().items():
+            frames = self._by_function[name][1][0]
+            sections.append(f"{name} ({frames} frames, ms)\n{format_stats(stats)}")
+        return "\n\n".join(sections)
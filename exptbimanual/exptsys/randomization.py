@@ -0,0 +1,184 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Seeded trial orders with constraints, built directly rather than by rejection sampling:
+
+    constrained_order(hands, max_run=3, seed=s)     # shuffle trials, never more than 3 of a hand in a row
+    balanced_sequence(4, repetitions=2, seed=s)     # every ordered pair of 4 conditions follows equally often
+    latin_square(4)[participant_index % 4]          # Williams (carry-over balanced) counterbalancing
+    precompute_orders(ids, make_order)              # the same, for every participant ahead of time
+
+Orders are permutations of trial indices, as taken by trialtable.compile_design(order=...).
+"""
+
+import zlib
+from typing import Callable, Hashable, Optional, Sequence
+
+import numpy as np
+
+
+def participant_seed(*parts: Hashable, seed: int = 0) -> np.random.Generator:
+    """
+    A generator seeded from e.g. (subid, session), identical across runs and machines
+    (unlike hash(), which is salted per process for strings).
+    """
+    key = [seed] + [zlib.crc32(str(part).encode()) for part in parts]
+    return np.random.default_rng(key)
+
+
+def _feasible(counts: np.ndarray, last: int, run: int, max_run: int) -> bool:
+    """
+    Whether the remaining counts can still be arranged with no run longer than max_run, given that the
+    sequence so far ends with a run of `run` copies of label `last` (last = -1 at the start).
+    """
+    total = counts.sum()
+    others = total - counts
+    limits = max_run * (others + 1)
+    if last >= 0:
+        # the current run can only grow by max_run - run before something else is needed
+        limits[last] = (max_run - run) + max_run * others[last]
+    return bool(np.all(counts <= limits))
+
+
+def constrained_labels(counts: Sequence[int], max_run: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    A random sequence containing label i counts[i] times, with no label repeated more than max_run times
+    in a row. Each label is drawn with probability proportional to how many of it remain, skipping any
+    draw that would make the rest of the sequence impossible, so it never backtracks: O(len * n_labels).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    remaining = np.array(counts, dtype=np.int64)
+    if max_run < 1 or not _feasible(remaining, -1, 0, max_run):
+        raise ValueError(f"No order of counts {[int(count) for count in counts]} has runs of at most {max_run}")
+
+    sequence = np.empty(remaining.sum(), dtype=np.int64)
+    last, run = -1, 0
+    for position in range(len(sequence)):
+        weights = remaining.astype(float)
+        if run >= max_run:
+            weights[last] = 0.0
+        # try labels in a weighted random order until one keeps the rest feasible
+        candidates = np.flatnonzero(weights)
+        keys = rng.random(len(candidates)) ** (1.0 / weights[candidates])
+        for label in candidates[np.argsort(-keys)]:
+            next_run = run + 1 if label == last else 1
+            remaining[label] -= 1
+            if _feasible(remaining, label, next_run, max_run):
+                break
+            remaining[label] += 1
+        else:
+            raise ValueError("No feasible continuation")  # can't happen when the start was feasible
+        sequence[position] = label
+        last, run = label, next_run
+    return sequence
+
+
+def constrained_order(
+    labels: Sequence[Hashable], max_run: int, rng: Optional[np.random.Generator] = None, seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    A random permutation of trials (given one label per trial, e.g. the responding hand) in which no label
+    occurs more than max_run times in a row. Trials sharing a label are shuffled among themselves.
+    """
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    codes, uniques = _codes(labels)
+    sequence = constrained_labels(np.bincount(codes, minlength=len(uniques)), max_run, rng)
+
+    order = np.empty(len(codes), dtype=np.int64)
+    for label in range(len(uniques)):
+        order[sequence == label] = rng.permutation(np.flatnonzero(codes == label))
+    return order
+
+
+def balanced_sequence(
+    n_conditions: int, repetitions: int = 1, rng: Optional[np.random.Generator] = None, seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    A random sequence of condition indices in which every ordered pair (i, j), including i == j, follows
+    exactly `repetitions` times (first-order counterbalancing). Length is n_conditions**2 * repetitions + 1.
+    Built as a random Eulerian circuit of the complete directed graph, in linear time.
+    """
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    # outgoing edges of each condition, in random order
+    edges = [list(rng.permutation(np.repeat(np.arange(n_conditions), repetitions))) for _ in range(n_conditions)]
+
+    # Hierholzer's algorithm
+    stack = [int(rng.integers(n_conditions))]
+    circuit = []
+    while stack:
+        node = stack[-1]
+        if edges[node]:
+            stack.append(int(edges[node].pop()))
+        else:
+            circuit.append(stack.pop())
+    return np.array(circuit[::-1], dtype=np.int64)
+
+
+def latin_square(n: int) -> np.ndarray:
+    """
+    Williams design: rows are condition orders in which every condition appears once in every position and
+    immediately follows every other condition equally often. n rows for even n, 2n rows for odd n.
+    """
+    first = [0]
+    low, high = 1, n - 1
+    while len(first) < n:
+        first.append(low)
+        low += 1
+        if len(first) < n:
+            first.append(high)
+            high -= 1
+    rows = (np.array(first)[np.newaxis, :] + np.arange(n)[:, np.newaxis]) % n
+    if n % 2:
+        rows = np.vstack([rows, rows[:, ::-1]])
+    return rows
+
+
+def counterbalanced_row(participant_index: int, n: int) -> np.ndarray:
+    """
+    The latin_square(n) row for participant_index (cycling through the rows).
+    """
+    square = latin_square(n)
+    return square[participant_index % len(square)]
+
+
+def precompute_orders(
+    participant_ids: Sequence[Hashable],
+    make_order: Callable[[np.random.Generator], np.ndarray],
+    seed: int = 0,
+) -> dict[Hashable, np.ndarray]:
+    """
+    {participant id: make_order(rng)} with each participant's rng from participant_seed(id, seed=seed),
+    so the orders used in a session can be generated (and checked, or saved with np.savez) in advance.
+    """
+    return {participant: make_order(participant_seed(participant, seed=seed)) for participant in participant_ids}
+
+
+def max_run_length(labels: Sequence[Hashable]) -> int:
+    """
+    Longest run of identical consecutive labels, for checking orders.
+    """
+    codes, _ = _codes(labels)
+    if not len(codes):
+        return 0
+    boundaries = np.flatnonzero(np.diff(codes)) + 1
+    return int(np.diff(np.concatenate([[0], boundaries, [len(codes)]])).max())
+
+
+def _codes(labels: Sequence[Hashable]) -> tuple[np.ndarray, list]:
+    uniques: dict = {}
+    codes = np.array([uniques.setdefault(label, len(uniques)) for label in labels], dtype=np.int64)
+    return codes, list(uniques)
@@ -18,16 +18,18 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from dataclasses import dataclass
 from enum import StrEnum
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
 
 
 import pygame
+import random
 import threading
-from timeit import default_timer
 from queue import Queue, Empty
 from evdev import InputDevice, ecodes, list_devices
 import rich
 
+from exptbimanual.exptsys import timing
+
 
 class InputSource(StrEnum):
     keyboard = "keyboard"
@@ -39,7 +41,7 @@ class InputRecord:
     type: InputSource
     device: str
     value: str
-    time: float
+    time: float  # session ms (timing.now()) when the input thread read the event
 
     def __repr__(self) -> str:
         return (
@@ -211,7 +213,7 @@ def input_thread(dev: InputDevice, stop_event: threading.Event):
         and signals stop_event so that all threads—and the main loop—shut down.
     """
     last_press_time = {}
-    debounce_interval = DEBOUNCE_INTERVAL_MS / 1000.0
+    debounce_interval = DEBOUNCE_INTERVAL_MS
 
     # A set of currently pressed keys on this device, e.g. {"KEY_LEFTCTRL", "KEY_A", ...}
     dev.pressed_keys = set()
@@ -238,7 +240,7 @@ def input_thread(dev: InputDevice, stop_event: threading.Event):
 
             if event.type == ecodes.EV_KEY:
                 key_name = ecodes.KEY.get(event.code, f"KEY_{event.code}")
-                now = default_timer()
+                now = timing.now()
 
                 # --- KEY DOWN (value == 1) ---
                 if event.value == 1:
@@ -294,6 +296,33 @@ def input_thread(dev: InputDevice, stop_event: threading.Event):
         dev.close()
 
 
+def synthetic_responder(seed: Optional[int] = None) -> Callable[[], None]:
+    """
+    Returns a function that enqueues one keyboard record for a key drawn at random from the
+    currently allowed_responses (SPACE if unrestricted), so that loops waiting for responses always terminate.
+    Call it from a timer, e.g. timing.VirtualClock.call_every() in simulated sessions.
+    """
+    rng = random.Random(seed)
+
+    def respond():
+        key_name = rng.choice(sorted(allowed_responses)) if allowed_responses else "SPACE"
+        input_events.put(InputRecord(InputSource.keyboard, "synthetic", key_name, timing.now()))
+
+    return respond
+
+
+def synthetic_input_thread(stop_event: threading.Event, interval_ms: int = 250, seed: Optional[int] = None):
+    """
+    Stand-in for input_thread() when there are no real devices (e.g., headless runs).
+    Every interval_ms, enqueues a synthetic response (see synthetic_responder()). Runs until stop_event is set.
+    """
+    respond = synthetic_responder(seed)
+
+    debug_print(f"[THREAD] Starting synthetic input thread ({interval_ms} ms interval)")
+    while not stop_event.wait(interval_ms / 1000.0):
+        respond()
+
+
 if __name__ == "__main__":
 
     def response_module_test():
@@ -16,53 +16,251 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from typing import Optional, List, Callable, Set
+from dataclasses import dataclass, field
+from time import perf_counter_ns
+from typing import Any, Optional, List, Callable
 
+import numpy as np
 import pygame
 import sys
 
+from exptbimanual.exptsys import audio, timing
+from exptbimanual.exptsys.capture import FrameCapture
+from exptbimanual.exptsys.profiler import FrameProfiler
 from exptbimanual.exptsys.response import set_allowed_responses, InputRecord
+from exptbimanual.exptsys.stimulus import record_display
 import exptbimanual.exptsys.response
 
+# Frame timing, normally set once at startup by configure_frame_timing()
+frame_period_ms: Optional[float] = None  # true refresh period; None = unknown, durations stay in ms
+frames_synced: bool = False  # True if display.flip() waits for the refresh (vsync)
+lock_durations_to_frames: bool = True  # convert ms durations to whole frames when frame_period_ms is known
+
+# Optional stimulus auditing, see set_frame_capture()
+frame_capture: Optional[FrameCapture] = None
+
+# Optional per-phase frame timing, see set_frame_profiler()
+frame_profiler: Optional[FrameProfiler] = None
+
+
+@dataclass(slots=True)
+class LoopResult:
+    """
+    Summary of one run_loop() call.
+
+    Values returned by display_func are kept only when they change: frame_data maps each key to a list of
+    (frame, value) pairs, where frame is the index of the frame on which the value first appeared
+    (0 for the value of a recorded display). A loop showing the same display for 30 s costs one entry per key.
+    """
+
+    display_func: str
+    loop_start: float  # session ms (timing.now()), like every other time in the result
+    stop: float
+    duration: float  # ms
+    frames: int
+    onset: float  # when the first frame was flipped to the display (loop_start if no frame was shown)
+    responses: list[InputRecord]  # in order of arrival, only those made after onset
+    rts: list[float]  # reaction time of each response, ms from onset (empty if no frame was shown)
+    correct_responses: Optional[List[str]]
+    correct: bool
+    frame_data: dict[str, list[tuple[int, Any]]] = field(default_factory=dict)
+    profile: Optional[dict] = None  # per-phase frame timing (profiler.phase_stats) if a profiler is set
+    anticipations: list[InputRecord] = field(default_factory=list)  # made before onset: not scored, never end the loop
+
+    @property
+    def values(self) -> dict[str, Any]:
+        """
+        The last value display_func returned for each key.
+        """
+        return {key: changes[-1][1] for key, changes in self.frame_data.items()}
+
+    @property
+    def first_rt(self) -> Optional[float]:
+        return self.rts[0] if self.rts else None
+
+    @property
+    def last_rt(self) -> Optional[float]:
+        """
+        RT of the last response, e.g. of the second key of a two-key response.
+        """
+        return self.rts[-1] if self.rts else None
+
+    def response_values(self) -> list[str]:
+        return [str(response.value) for response in self.responses]
+
+
+def _same(old: Any, new: Any) -> bool:
+    if old is new:
+        return True
+    if isinstance(old, np.ndarray) or isinstance(new, np.ndarray):
+        # == on arrays is elementwise, so its truth value is ambiguous
+        return isinstance(old, np.ndarray) and isinstance(new, np.ndarray) and np.array_equal(old, new)
+    try:
+        return bool(old == new)
+    except (TypeError, ValueError):
+        # e.g. pandas objects, whose == can't be used as a bool: treat as changed
+        return False
+
+
+def _record_changes(frame_data: dict[str, list[tuple[int, Any]]], frame: int, values: dict):
+    for key, value in values.items():
+        changes = frame_data.get(key)
+        if changes is None:
+            frame_data[key] = [(frame, value)]
+        elif not _same(changes[-1][1], value):
+            changes.append((frame, value))
+
+
+def configure_frame_timing(period_ms: Optional[float], synced: bool = False, lock_durations: bool = True):
+    """
+    Tell the runner the display's real refresh period (e.g., measured by display.open_display()).
+    With a known period, ms durations are converted to an exact number of frames.
+    If synced (vsync), flips already pace the loop, so the runner adds no wait of its own.
+    """
+    global frame_period_ms, frames_synced, lock_durations_to_frames
+    frame_period_ms = period_ms if period_ms else None
+    frames_synced = synced
+    lock_durations_to_frames = lock_durations
+
+
+def set_frame_capture(capture: Optional[FrameCapture]):
+    """
+    Capture the first frame of every loop with capture (None turns capturing off).
+    """
+    global frame_capture
+    frame_capture = capture
+
+
+def set_frame_profiler(profiler: Optional[FrameProfiler]):
+    """
+    Time every phase of every frame with profiler (None turns profiling off).
+    """
+    global frame_profiler
+    frame_profiler = profiler
+
+
+def duration_to_frames(duration: int) -> int:
+    """
+    Number of refreshes closest to duration ms (at least 1), or 0 if the refresh period is unknown.
+    """
+    if not frame_period_ms or not duration:
+        return 0
+    return max(1, round(duration / frame_period_ms))
+
 
 def run_loop(
     screen: pygame.Surface,
     display_func: Callable,
-    duration: int = 0,  # will end loop if duration ms have passed
+    duration: int = 0,  # will end loop if duration ms have passed (as whole frames if the refresh period is known)
+    duration_frames: int = 0,  # will end loop after exactly this many frames have been presented. overrides duration
+    until: Optional[float] = None,  # will end loop at this session time (ms), e.g. from a Timeline. overrides both
     wait_for_responses: int = 0,  # will end loop if this number of responses received. 0=don't stop on response.
     responses_allowed: Optional[List[str]] = None,  # e.g., ['A', 'SPACE', '1', '2']. If [], no restriction applied
     correct_responses: Optional[List[str]] = None,  # if empty, any response is correct
     exact_match: bool = False,  # whether the full response set must be an exact match to the full correct response set.
     clear_inputs: bool = True,  # if True, clears response.input_events prior to running loop
-    refresh_rate: int = 60,
-    fill_color: str = "black",
-) -> dict:
+    refresh_rate: Optional[int] = None,  # None = measured refresh rate if known, else 60
+    fill_color: Optional[str] = "black",  # None skips the fill, e.g. when display_func draws a full-screen Scene
+    record: bool = False,  # if True, display_func runs once and its blits are replayed each frame (static displays)
+    on_enter: Optional[Callable[[], Any]] = None,  # called once before the first frame is drawn
+    on_first_flip: Optional[Callable[[float], Any]] = None,  # called once with the onset, right after the first flip
+    on_frame: Optional[Callable[[int], Any]] = None,  # called after every flip with the frame's index
+    on_exit: Optional[Callable[[LoopResult], Any]] = None,  # called once with the result, before it's returned
+) -> LoopResult:
+    """
+    Present display_func once per frame until the duration has passed or enough responses have arrived.
+
+    The on_* hooks are for one-shot work that belongs to this display rather than to every frame, e.g.
+    on_enter=lambda: audio.scheduler.play(beep, at="flip") plays a sound exactly once, as the display appears.
+    """
     set_allowed_responses([] if not responses_allowed else responses_allowed)
 
     if clear_inputs:
         exptbimanual.exptsys.response.input_events.clear()
 
-    responses: Set[InputRecord] = set()
-    data: list = []
-    clock = pygame.time.Clock()
+    responses: list[InputRecord] = []
+    anticipations: list[InputRecord] = []
+    frame_data: dict[str, list[tuple[int, Any]]] = {}
 
-    start_time = pygame.time.get_ticks()
+    # static display functions are called once and replayed as a display list
+    display_list = record_display(display_func) if record else None
+    if display_list is not None and display_list.result:
+        _record_changes(frame_data, 0, display_list.result)
+
+    if not duration_frames and duration and lock_durations_to_frames:
+        duration_frames = duration_to_frames(duration)
+    if refresh_rate is None:
+        refresh_rate = round(1000 / frame_period_ms) if frame_period_ms else 60
+    frames_presented = 0
+
+    # when profiling, stamps[i] is taken before phase i (see profiler.PHASES) and stamps[-1] after the last
+    profiler = frame_profiler
+    stamps = None
+    if profiler is not None:
+        profiler.start_loop(display_func.func.__name__)
+
+    start_ns = timing.now_ns()
+    onset_ns: Optional[int] = None
+    onset_ms: Optional[float] = None  # onset_ns as session ms, for comparing with response times
+
+    # frames are paced by the flip itself with vsync, otherwise by a precise sleep/spin wait
+    pacer = timing.FramePacer(1000 / refresh_rate)
+    pacer.start(start_ns)
+    # ms durations that aren't locked to frames end on their own deadline, which needn't fall on a frame
+    if until is not None:
+        # whatever time is left until the absolute end, however long the setup before this loop took.
+        # if that's already past, the loop stops before its first flip
+        remaining = until - timing.session_clock.to_ms(start_ns)
+        duration_frames = duration_to_frames(remaining) if lock_durations_to_frames and remaining > 0 else 0
+        deadline_ns = start_ns + int(max(remaining, 0.0) * timing.NS_PER_MS) if not duration_frames else None
+    else:
+        deadline_ns = start_ns + int(duration * timing.NS_PER_MS) if duration and not duration_frames else None
+    expired = False
+
+    if on_enter is not None:
+        on_enter()
 
     while True:
+        if profiler is not None:
+            stamps = profiler.next_frame()
+            stamps[0] = perf_counter_ns()
+
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 sys.exit()
 
+        if stamps is not None:
+            stamps[1] = perf_counter_ns()
+
+        # start any sounds that are due and report finished ones
+        audio.scheduler.update()
+
+        if stamps is not None:
+            stamps[2] = perf_counter_ns()
+
         # clear screen each frame
-        screen.fill(fill_color)
+        if fill_color is not None:
+            screen.fill(fill_color)
+
+        if stamps is not None:
+            stamps[3] = perf_counter_ns()
 
         # use display_func to draw frame contents offscreen
-        result = display_func()  # should return a dict
-        if result:
-            data.append(result)
+        if display_list is not None:
+            display_list.replay(screen)
+        else:
+            result = display_func()  # should return a dict
+            if result:
+                _record_changes(frame_data, frames_presented, result)
+
+        if stamps is not None:
+            stamps[4] = perf_counter_ns()
 
         # break out of loop if duration set and expired
-        if duration and pygame.time.get_ticks() - start_time >= duration:
+        if duration_frames:
+            if frames_presented >= duration_frames:
+                break
+        elif deadline_ns is not None and timing.now_ns() >= deadline_ns:
             break
 
         # get any existing responses available in input event queue
@@ -72,19 +270,66 @@ def run_loop(
                 running = False
                 sys.exit()
 
-            # otherwise, store the response
-            responses.add(response)
+            # otherwise, store the response. responses made before the display appeared can't be to it
+            if onset_ms is None or response.time < onset_ms:
+                anticipations.append(response)
+            else:
+                responses.append(response)
 
         # break out of loop if waiting for 1 or more responses and they have been registered
         if wait_for_responses and len(responses) >= wait_for_responses:
             break
 
+        if stamps is not None:
+            stamps[5] = perf_counter_ns()
+
+        # keep a copy of what is about to be shown for auditing (encoded off the main thread)
+        if frame_capture is not None and frames_presented == 0:
+            frame_capture.capture(screen, display_func.func.__name__)
+
+        if stamps is not None:
+            stamps[6] = perf_counter_ns()
+
         # push the frame to the display
         pygame.display.flip()
-        clock.tick(refresh_rate)
+        first_flip = onset_ns is None
+        if first_flip:
+            onset_ns = timing.now_ns()
+            onset_ms = timing.session_clock.to_ms(onset_ns)
+        audio.scheduler.on_flip()
+        frames_presented += 1
+
+        if first_flip and on_first_flip is not None:
+            on_first_flip(onset_ms)
+        if on_frame is not None:
+            on_frame(frames_presented - 1)
+
+        if stamps is not None:
+            stamps[7] = perf_counter_ns()
+
+        if not frames_synced:
+            if deadline_ns is not None and deadline_ns <= pacer.next_deadline_ns:
+                # the loop ends before another frame is due, so wait for the deadline itself
+                timing.wait_until(deadline_ns)
+                expired = True
+            else:
+                pacer.wait()
+
+        if stamps is not None:
+            stamps[8] = perf_counter_ns()
+            profiler.end_frame()
+
+        if expired:
+            break
+
+    # sounds meant to start with this display (e.g. from on_enter) mustn't play with the next one instead
+    if not frames_presented:
+        audio.scheduler.cancel_flip()
 
     # store final bit of data for this loop
-    end_time = pygame.time.get_ticks()
+    end_ns = timing.now_ns()
+    clock = timing.session_clock
+    onset = clock.to_ms(onset_ns if onset_ns is not None else start_ns)
     if not correct_responses:
         correct = True
     else:
@@ -95,16 +340,21 @@ def run_loop(
         else:
             correct = response_value_set <= target_value_set
 
-    data.append(
-        {
-            "display_func": f"{display_func.func.__name__}",
-            "loop_start": start_time,
-            "stop": end_time,
-            "duration": end_time - start_time,
-            "responses": responses,
-            "correct_responses": correct_responses,
-            "correct": correct,
-        }
+    result = LoopResult(
+        display_func=display_func.func.__name__,
+        loop_start=clock.to_ms(start_ns),
+        stop=clock.to_ms(end_ns),
+        duration=(end_ns - start_ns) / timing.NS_PER_MS,
+        frames=frames_presented,
+        onset=onset,
+        responses=responses,
+        rts=[response.time - onset for response in responses] if frames_presented else [],
+        correct_responses=correct_responses,
+        correct=correct,
+        frame_data=frame_data,
+        profile=profiler.end_loop() if profiler is not None else None,
+        anticipations=anticipations,
     )
-
-    return {k: v for d in data for k, v in d.items()}
+    if on_exit is not None:
+        on_exit(result)
+    return result
@@ -0,0 +1,271 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Cooperative trial scheduling with asyncio. Trial phases, timers, sounds and response waits are coroutines
+that share one frame-paced event loop, so things that overlap within a trial are written side by side:
+
+    async def trial(s: FrameScheduler):
+        onset = await s.present(draw_pics(screen, left, right))
+        s.spawn(beep_after(s, 200))                                   # runs alongside the rest of the trial
+        responses = await s.wait_for_responses(1, allowed=list("ASKL"), timeout_ms=2000)
+        s.show(None)                                                  # blank from the next frame
+        return [response.time - onset for response in responses]
+
+    async def beep_after(s: FrameScheduler, ms: float):
+        await s.wait(ms)
+        s.play(setup.media.beep_high)
+
+    rts = FrameScheduler(screen).run(trial)
+
+Between frames the scheduler waits precisely for the next frame (see timing.FramePacer), firing any timers
+that fall due in the meantime at their own time, so waits and sounds aren't rounded to frames.
+"""
+
+import asyncio
+import heapq
+import itertools
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Callable, Coroutine, Optional, Sequence
+
+import pygame
+
+import exptbimanual.exptsys.response
+from exptbimanual.exptsys import audio, runner, timing
+from exptbimanual.exptsys.response import InputRecord, set_allowed_responses
+
+
+@dataclass
+class _ResponseWait:
+    future: asyncio.Future
+    count: int
+    allowed: Optional[set[str]]
+    responses: list[InputRecord] = field(default_factory=list)
+
+
+class FrameScheduler:
+    """
+    Owns the frame loop while run() is active: each frame it handles pygame events, starts due sounds, hands
+    new input to response waits, fires due timers, lets woken coroutines run, draws the displays that are
+    shown (one per layer, in the order layers were first shown), flips and resolves frame waits.
+    """
+
+    # event loop passes given to woken coroutines before a frame is drawn, so they can react in the same frame
+    settle_passes = 3
+
+    def __init__(self, screen: pygame.Surface, fill_color: Optional[str] = "black", refresh_rate: Optional[int] = None):
+        self.screen = screen
+        self.fill_color = fill_color
+        if refresh_rate is None:
+            refresh_rate = round(1000 / runner.frame_period_ms) if runner.frame_period_ms else 60
+        self.pacer = timing.FramePacer(1000 / refresh_rate)
+        self.layers: dict[str, Callable] = {}
+        self.frames = 0
+        self._frame_waits: list[asyncio.Future] = []
+        self._response_waits: list[_ResponseWait] = []
+        self._timers: list[tuple[int, int, asyncio.Future]] = []  # heap of (deadline_ns, sequence, future)
+        self._sequence = itertools.count()
+        self._tasks: set[asyncio.Task] = set()
+
+    # --- used by coroutines -------------------------------------------------------
+
+    @staticmethod
+    def now() -> float:
+        """
+        Session time in ms (timing.now()).
+        """
+        return timing.now()
+
+    def show(self, display_func: Optional[Callable], layer: str = "main"):
+        """
+        Draw display_func (a return_partial display function) every frame from the next frame on.
+        None removes the layer.
+        """
+        if display_func is None:
+            self.layers.pop(layer, None)
+        else:
+            self.layers[layer] = display_func
+
+    def frame(self) -> asyncio.Future:
+        """
+        Resolves (with the session time of the flip) after the next frame has been flipped.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._frame_waits.append(future)
+        return future
+
+    async def present(self, display_func: Optional[Callable], layer: str = "main") -> float:
+        """
+        Show display_func and return its onset, the session time of the flip that first showed it.
+        """
+        self.show(display_func, layer)
+        return await self.frame()
+
+    def wait(self, ms: float) -> asyncio.Future:
+        """
+        Resolves (with the session time it fired) ms from now, independent of frames.
+        """
+        return self.wait_until_ns(timing.now_ns() + int(ms * timing.NS_PER_MS))
+
+    def wait_until_ns(self, deadline_ns: int) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._timers, (deadline_ns, next(self._sequence), future))
+        return future
+
+    def wait_for_responses(
+        self, count: int = 1, allowed: Optional[Sequence[str]] = None, timeout_ms: Optional[float] = None
+    ) -> asyncio.Future:
+        """
+        Resolves with a list of InputRecords once count responses from allowed (None = any) have arrived,
+        or with however many arrived by timeout_ms. Several response waits can be active at once.
+        """
+        future = asyncio.get_running_loop().create_future()
+        wait = _ResponseWait(future, count, {str(key).upper() for key in allowed} if allowed else None)
+        self._response_waits.append(wait)
+        self._update_allowed_responses()
+        if timeout_ms is not None:
+            # take whatever arrived up to the timeout, including input not yet handed out this frame
+            timeout = self.wait(timeout_ms)
+            timeout.add_done_callback(lambda _: (self._dispatch_responses(), self._finish_response_wait(wait)))
+            future.add_done_callback(lambda _: timeout.cancel())
+        return future
+
+    def play(self, sound: pygame.mixer.Sound, volume: float = 1.0, at: str | float = audio.AT_NOW, label: str = ""):
+        """
+        Start sound through the audio scheduler (at: "now", "flip" or a session time in ms).
+        Returns a future that resolves with the PlaybackRecord when the sound has finished.
+        """
+        future = asyncio.get_running_loop().create_future()
+
+        def done(record: audio.PlaybackRecord):
+            if not future.done():
+                future.set_result(record)
+
+        audio.scheduler.play(sound, volume=volume, at=at, on_done=done, label=label)
+        return future
+
+    def spawn(self, coroutine: Coroutine) -> asyncio.Task:
+        """
+        Run coroutine alongside the caller. Unfinished spawned tasks are cancelled when run() returns.
+        """
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    # --- the frame loop -----------------------------------------------------------
+
+    def run(self, main: Callable[["FrameScheduler"], Coroutine], clear_inputs: bool = True) -> Any:
+        """
+        Run main(self) to completion on a frame-paced event loop and return its result.
+        """
+        if clear_inputs:
+            exptbimanual.exptsys.response.input_events.clear()
+        return asyncio.run(self._run(main))
+
+    async def _run(self, main: Callable[["FrameScheduler"], Coroutine]) -> Any:
+        task = asyncio.get_running_loop().create_task(main(self))
+        self.pacer.start()
+        try:
+            while not task.done():
+                await self._step()
+            return task.result()
+        finally:
+            for spawned in list(self._tasks):
+                spawned.cancel()
+            for wait in [*self._frame_waits, *(timer[2] for timer in self._timers)]:
+                wait.cancel()
+            for response_wait in self._response_waits:
+                response_wait.future.cancel()
+            self._frame_waits, self._timers, self._response_waits = [], [], []
+            set_allowed_responses([])
+
+    async def _settle(self):
+        for _ in range(self.settle_passes):
+            await asyncio.sleep(0)
+
+    async def _step(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                sys.exit()
+        audio.scheduler.update()
+
+        self._dispatch_responses()
+        self._fire_timers(timing.now_ns())
+        await self._settle()
+
+        if self.fill_color is not None:
+            self.screen.fill(self.fill_color)
+        for display_func in list(self.layers.values()):
+            display_func()
+
+        pygame.display.flip()
+        flip_time = timing.now()
+        audio.scheduler.on_flip()
+        self.frames += 1
+        frame_waits, self._frame_waits = self._frame_waits, []
+        for future in frame_waits:
+            if not future.done():
+                future.set_result(flip_time)
+        await self._settle()
+
+        if not runner.frames_synced:
+            # fire timers that fall before the next frame at their own time, then wait for the frame
+            while self._timers and self._timers[0][0] <= self.pacer.next_deadline_ns:
+                timing.wait_until(self._timers[0][0])
+                self._fire_timers(timing.now_ns())
+                await self._settle()
+            self.pacer.wait()
+
+    def _fire_timers(self, now_ns: int):
+        fired = timing.session_clock.to_ms(now_ns)
+        while self._timers and self._timers[0][0] <= now_ns:
+            _, _, future = heapq.heappop(self._timers)
+            if not future.done():
+                future.set_result(fired)
+
+    def _dispatch_responses(self):
+        new = exptbimanual.exptsys.response.input_events.all_responses()
+        for response in new:
+            if response.value == "__EXIT__":
+                sys.exit()
+        for wait in list(self._response_waits):
+            if wait.future.done():
+                self._response_waits.remove(wait)
+                continue
+            for response in new:
+                if wait.allowed is None or str(response.value).upper() in wait.allowed:
+                    wait.responses.append(response)
+            if len(wait.responses) >= wait.count:
+                self._finish_response_wait(wait)
+
+    def _finish_response_wait(self, wait: _ResponseWait):
+        if wait in self._response_waits:
+            self._response_waits.remove(wait)
+        if not wait.future.done():
+            wait.future.set_result(wait.responses[: wait.count])
+        self._update_allowed_responses()
+
+    def _update_allowed_responses(self):
+        # the input threads filter on the union of what the active waits accept
+        allowed: set[str] = set()
+        for wait in self._response_waits:
+            if wait.allowed is None:
+                set_allowed_responses([])
+                return
+            allowed |= wait.allowed
+        set_allowed_responses(sorted(allowed))
@@ -17,11 +17,14 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 from functools import partial, update_wrapper, lru_cache
-from typing import Callable
+from typing import Any, Callable, Optional
 
 
 import pygame
 
+from exptbimanual.exptsys import audio, timing
+from exptbimanual.exptsys.textatlas import glyph_atlas
+
 
 def return_partial(func: Callable) -> Callable:
     def wrapper(*args, **kwargs):
@@ -31,6 +34,79 @@ def return_partial(func: Callable) -> Callable:
     return wrapper
 
 
+class DisplayListRecorder:
+    """
+    Stands in for the screen while a display function runs, capturing its blits as a display list instead of
+    drawing them. Only blits and read-only queries (size, rect, etc.) are supported. Anything else (fill,
+    pygame.draw calls) raises, which tells record_display() that the display function can't be recorded.
+    """
+
+    _passthrough = ("get_size", "get_width", "get_height", "get_rect", "get_bitsize", "get_flags", "get_clip")
+
+    def __init__(self, screen: pygame.Surface):
+        self._screen = screen
+        self.items: list[tuple] = []
+
+    def blit(self, source: pygame.Surface, dest, area=None, special_flags: int = 0) -> pygame.Rect:
+        if area is None and not special_flags:
+            self.items.append((source, dest))
+        else:
+            self.items.append((source, dest, area, special_flags))
+        return pygame.Rect((dest[0], dest[1]), source.get_size()).clip(self._screen.get_rect())
+
+    def blits(self, blit_sequence, doreturn=1):
+        rects = [self.blit(*item) for item in blit_sequence]
+        return rects if doreturn else None
+
+    def __getattr__(self, name: str):
+        if name in self._passthrough:
+            return getattr(self._screen, name)
+        raise AttributeError(f"{name} can't be recorded in a display list")
+
+
+class DisplayList:
+    """
+    The recorded blits of one call of a display function, plus the data it returned.
+    replay() redraws them with a single batched call.
+    """
+
+    def __init__(self, items: list[tuple], result: Any = None):
+        self.items = items
+        self.result = result
+        # (surface, dest) pairs can use fblits where available (pygame-ce), anything with area/flags needs blits
+        self._fast = all(len(item) == 2 for item in items)
+
+    def replay(self, screen: pygame.Surface):
+        if self._fast and hasattr(screen, "fblits"):
+            screen.fblits(self.items)
+        else:
+            screen.blits(self.items, doreturn=False)
+
+
+def record_display(display_func: partial) -> Optional[DisplayList]:
+    """
+    Call a display function (a partial made by a return_partial function) once with its screen swapped for a
+    DisplayListRecorder. Returns the recorded DisplayList, or None if the function does something other than blit.
+    Only valid for display functions that draw the same thing every frame.
+    """
+    if "screen" in display_func.keywords:
+        screen = display_func.keywords["screen"]
+        recorder = DisplayListRecorder(screen)
+        recording = partial(display_func.func, *display_func.args, **(display_func.keywords | {"screen": recorder}))
+    elif display_func.args:
+        recorder = DisplayListRecorder(display_func.args[0])
+        recording = partial(display_func.func, recorder, *display_func.args[1:], **display_func.keywords)
+    else:
+        return None
+
+    try:
+        result = recording()
+    except (TypeError, AttributeError):
+        return None
+
+    return DisplayList(recorder.items, result)
+
+
 @lru_cache(maxsize=128)
 def text_to_surface(text: str, font_name: str, font_size: int, color: str) -> pygame.Surface:
     """
@@ -77,6 +153,29 @@ def draw_text(
     screen.blit(text_surface, rect)
 
 
+def draw_dynamic_text(
+    screen: pygame.Surface,
+    text: str,
+    position: tuple[int, int],
+    center_on_position: bool = True,
+    font: tuple[str, int] = ("Arial", 14),
+    color="white",
+):
+    """
+    Same as draw_text(), but for text that changes from trial to trial or frame to frame
+    (e.g., "523 ms", countdowns). Strings are composed from a cached glyph atlas instead of
+    being rendered (and cached) whole, so new strings never trigger a font render.
+    """
+    font_name, font_size = font
+    atlas = glyph_atlas(font_name, font_size, color)
+
+    if center_on_position:
+        width, height = atlas.size(text)
+        position = (position[0] - width // 2, position[1] - height // 2)
+
+    atlas.render_to(screen, text, position)
+
+
 def draw_multiline_text(
     screen: pygame.Surface,
     text: str,
@@ -113,21 +212,75 @@ def draw_multiline_text(
         y += line_height
 
 
+class Scene:
+    """
+    A screen built from static layers, composed once into a cached surface, plus dynamic overlays
+    that are redrawn every frame. Drawing a scene costs one full-screen blit plus the overlays.
+    Layers and overlays are callables that take the target surface as their only positional argument, e.g.:
+
+        scene = Scene(screen.get_size())
+        scene.add_static(partial(draw_text, text="+", position=screen_center))
+        scene.add_overlay(partial(draw_text, text="CORRECT!", position=(screen_center[0], 50)))
+        scene.draw(screen)
+    """
+
+    def __init__(self, size: tuple[int, int], fill_color: str = "black"):
+        self.size = size
+        self.fill_color = fill_color
+        self._static: list[Callable[[pygame.Surface], Any]] = []
+        self._overlays: list[Callable[[pygame.Surface], Any]] = []
+        self._cache: Optional[pygame.Surface] = None
+
+    def add_static(self, layer: Callable[[pygame.Surface], Any]) -> "Scene":
+        self._static.append(layer)
+        self.invalidate()
+        return self
+
+    def add_overlay(self, overlay: Callable[[pygame.Surface], Any]) -> "Scene":
+        self._overlays.append(overlay)
+        return self
+
+    def invalidate(self):
+        """
+        Force the static layers to be recomposed on the next draw (e.g., after changing something they depend on).
+        """
+        self._cache = None
+
+    @property
+    def surface(self) -> pygame.Surface:
+        """
+        The composed static layers.
+        """
+        if self._cache is None:
+            surface = pygame.Surface(self.size)
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            surface.fill(self.fill_color)
+            for layer in self._static:
+                layer(surface)
+            self._cache = surface
+        return self._cache
+
+    def draw(self, screen: pygame.Surface):
+        screen.blit(self.surface, (0, 0))
+        for overlay in self._overlays:
+            overlay(screen)
+
+
 def play_sound(sound: pygame.mixer.Sound, wait: bool = False, volume: float = 1.0):
     """
     Play a previously loaded sound.
-    If duration is 0, use sound.get_length() to set duration.
     Should work with wav, mp3, ogg.
     Volume must be between 0.0 and 1.0
+    Playback goes through audio.scheduler. wait=True blocks until the sound ends, so never use it from inside
+    a display function; use audio.scheduler.play(..., at="flip", on_done=...) there instead.
     """
-    sound.set_volume(volume)
-
-    sound.play()
+    record = audio.scheduler.play(sound, volume=volume)
     if wait:
         wait_ms = int(sound.get_length() * 1000)
         elapsed = 0
         tick = 50  # polling interval in ms
 
-        while elapsed < wait_ms and pygame.mixer.get_busy():
-            pygame.time.delay(tick)
+        while elapsed < wait_ms and audio.scheduler.is_playing(record):
+            timing.wait(tick)
             elapsed += tick
@@ -0,0 +1,109 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Glyph atlas for dynamic text (RT feedback, running accuracy, countdowns, etc.).
+stimulus.text_to_surface() caches whole strings, which is ideal for fixed text but misses on every new value.
+A GlyphAtlas rasterises each glyph of a font/size/color once and composes any string from those glyphs,
+so drawing dynamic text costs roughly one blit per character and never touches the rasteriser.
+"""
+
+import string
+from functools import lru_cache
+
+import pygame
+import pygame.freetype
+
+DEFAULT_CHARSET = string.digits + string.ascii_letters + string.punctuation + " "
+
+
+class GlyphAtlas:
+    def __init__(self, font_name: str, font_size: int, color: str = "white", charset: str = DEFAULT_CHARSET):
+        if not pygame.freetype.get_init():
+            pygame.freetype.init()
+        self.font = pygame.freetype.SysFont(font_name, font_size)
+        self.color = pygame.Color(color)
+        self.ascender = self.font.get_sized_ascender()
+        self.height = self.font.get_sized_height()
+
+        # char -> (surface, x offset from pen position, y offset from top of line, advance)
+        self._glyphs: dict[str, tuple[pygame.Surface, int, int, int]] = {}
+        # (left char, right char) -> kerning adjustment in pixels
+        self._kerning: dict[tuple[str, str], int] = {}
+
+        for char in charset:
+            self._glyph(char)
+
+    def _glyph(self, char: str) -> tuple[pygame.Surface, int, int, int]:
+        glyph = self._glyphs.get(char)
+        if glyph is None:
+            # chars outside the charset are rasterised on first use and then cached like the rest
+            surface, rect = self.font.render(char, self.color)
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert_alpha()
+            metrics = self.font.get_metrics(char)
+            advance = round(metrics[0][4]) if metrics and metrics[0] else self.font.get_rect(char).width
+            # rect.x is the left bearing and rect.y the distance from the baseline to the top of the glyph
+            glyph = self._glyphs[char] = (surface, rect.x, self.ascender - rect.y, advance)
+        return glyph
+
+    def _kern(self, left: str, right: str) -> int:
+        pair = (left, right)
+        kern = self._kerning.get(pair)
+        if kern is None:
+            # freetype has no public kerning table, so measure the pair's layout with and without kerning
+            # (layout only, nothing is rasterised)
+            self.font.kerning = True
+            kerned = self.font.get_rect(left + right).width
+            self.font.kerning = False
+            kern = self._kerning[pair] = kerned - self.font.get_rect(left + right).width
+        return kern
+
+    def size(self, text: str) -> tuple[int, int]:
+        width = 0
+        previous = None
+        for char in text:
+            if previous is not None:
+                width += self._kern(previous, char)
+            width += self._glyph(char)[3]
+            previous = char
+        return width, self.height
+
+    def render_to(self, screen: pygame.Surface, text: str, position: tuple[int, int]) -> pygame.Rect:
+        """
+        Draw text with its top-left corner at position using a single blits() call.
+        """
+        x, y = position
+        blits = []
+        previous = None
+        for char in text:
+            surface, offset_x, offset_y, advance = self._glyph(char)
+            if previous is not None:
+                x += self._kern(previous, char)
+            if surface.get_width():
+                blits.append((surface, (x + offset_x, y + offset_y)))
+            x += advance
+            previous = char
+        screen.blits(blits, doreturn=False)
+        return pygame.Rect(position, (x - position[0], self.height))
+
+
+@lru_cache(maxsize=32)
+def glyph_atlas(font_name: str, font_size: int, color: str = "white") -> GlyphAtlas:
+    """
+    Return the (cached) atlas for a font, size, and color.
+    """
+    return GlyphAtlas(font_name, font_size, color)
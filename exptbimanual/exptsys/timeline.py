@@ -0,0 +1,143 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Session timelines. Back-to-back run_loop() calls each time their duration from their own start, so the
+setup between loops (building display functions, cache misses, clearing input) adds up over a block.
+A Timeline precomputes every phase's planned onset from the start of the timeline and ends each fixed-length
+phase at its planned absolute end instead, so overhead is absorbed by the following phase rather than
+accumulating. Phases that end on a response (duration None) re-anchor the plan at their actual end.
+"""
+
+from dataclasses import dataclass, asdict
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pygame
+
+from exptbimanual.exptsys import timing
+from exptbimanual.exptsys.runner import LoopResult, run_loop
+
+
+@dataclass
+class TimelinePhase:
+    name: str
+    duration: Optional[float]  # ms, None = open-ended (e.g., ends on a response)
+    planned_onset: Optional[float] = None  # ms from timeline start, None until known (after an open-ended phase)
+    onset: Optional[float] = None  # actual onset (first flip), ms from timeline start
+    end: Optional[float] = None  # actual end, ms from timeline start
+
+    @property
+    def planned_end(self) -> Optional[float]:
+        if self.planned_onset is None or self.duration is None:
+            return None
+        return self.planned_onset + self.duration
+
+    @property
+    def drift(self) -> Optional[float]:
+        """
+        How late (ms) the phase started relative to the plan.
+        """
+        if self.onset is None or self.planned_onset is None:
+            return None
+        return self.onset - self.planned_onset
+
+
+class Timeline:
+    """
+    An ordered list of (name, duration) phases, run one after another with run(), e.g.:
+
+        timeline = Timeline([("fixation", 1000), ("stimulus", None), ("feedback", 4000)] * n_trials)
+        timeline.start()
+        for trial in ...:
+            timeline.run("fixation", screen, draw_fixation(screen), record=True)
+            ...
+
+    With absolute=False, phases simply run for their duration (the usual back-to-back behaviour),
+    but drift is still recorded, so the two can be compared.
+    """
+
+    def __init__(self, phases: Sequence[tuple[str, Optional[float]]], absolute: bool = True):
+        self.absolute = absolute
+        self.phases = [TimelinePhase(name, duration) for name, duration in phases]
+        self.origin: Optional[float] = None  # session ms when the timeline started
+        self.index = 0  # next phase to run
+        self._plan(0, 0.0)
+
+    def _plan(self, first: int, onset: float):
+        # planned onsets are cumulative durations, up to (and including) the next open-ended phase
+        durations = []
+        for phase in self.phases[first:]:
+            durations.append(phase.duration)
+            if phase.duration is None:
+                break
+        fixed = np.array([duration or 0.0 for duration in durations[:-1]], dtype=float)
+        onsets = onset + np.concatenate([[0.0], np.cumsum(fixed)])
+        for phase, planned_onset in zip(self.phases[first:], onsets):
+            phase.planned_onset = float(planned_onset)
+
+    def start(self, origin: Optional[float] = None):
+        self.origin = timing.now() if origin is None else origin
+        self.index = 0
+
+    def run(self, name: str, screen: pygame.Surface, display_func, **run_loop_args) -> LoopResult:
+        """
+        Run the next phase (which must be called name) with run_loop(). run_loop_args are passed on,
+        except for the phase's duration, which comes from the timeline.
+        """
+        if self.origin is None:
+            self.start()
+        if self.index >= len(self.phases):
+            raise IndexError(f'Timeline has no phase left to run "{name}"')
+        phase = self.phases[self.index]
+        if phase.name != name:
+            raise ValueError(f'Timeline expected phase "{phase.name}" (#{self.index}), not "{name}"')
+
+        if phase.duration is not None:
+            if self.absolute:
+                run_loop_args["until"] = self.origin + phase.planned_end
+            else:
+                run_loop_args["duration"] = phase.duration
+        result = run_loop(screen, display_func, **run_loop_args)
+
+        phase.onset = result.onset - self.origin
+        phase.end = result.stop - self.origin
+        self.index += 1
+        if phase.duration is None and self.index < len(self.phases):
+            self._plan(self.index, phase.end)
+        return result
+
+    def to_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame([asdict(phase) for phase in self.phases])
+        frame["planned_end"] = [phase.planned_end for phase in self.phases]
+        frame["drift"] = [phase.drift for phase in self.phases]
+        return frame
+
+    def summary(self) -> dict:
+        """
+        Planned vs. actual length of the phases run so far, and the largest drift.
+        """
+        done = self.phases[: self.index]
+        drifts = [abs(phase.drift) for phase in done if phase.drift is not None]
+        last = done[-1] if done else None
+        return {
+            "phases": len(done),
+            "planned_ms": last.planned_end if last and last.planned_end is not None else None,
+            "actual_ms": last.end if last else None,
+            "max_abs_drift_ms": max(drifts) if drifts else None,
+            "mean_abs_drift_ms": float(np.mean(drifts)) if drifts else None,
+        }
@@ -0,0 +1,206 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+The session clock, and precise waits.
+
+Every timestamp in a session (input events, loop starts and stimulus onsets, sound onsets) is in ms since
+the session clock's origin, so times from the input threads, the runner, and audio can be subtracted
+directly, e.g. to get reaction times.
+
+All times and waits go through one clock (now_ns(), wait_until()): normally a RealClock, or a VirtualClock
+(see set_clock()) that skips straight to each deadline, so a whole session can be simulated in seconds.
+
+time.sleep() (and pygame's Clock.tick(), which sleeps the same way) can oversleep by
+a few ms, so RealClock waits sleep until sleep_margin_ms before the deadline and spin on perf_counter_ns()
+for the rest. Spinning only ever lasts about sleep_margin_ms, so CPU use stays low.
+"""
+
+import heapq
+import itertools
+import time
+from time import perf_counter_ns
+from typing import Callable, Optional
+
+NS_PER_MS = 1_000_000
+
+# how long before a deadline to stop sleeping and start spinning
+sleep_margin_ms: float = 2.0
+
+
+def set_sleep_margin(margin_ms: float):
+    global sleep_margin_ms
+    sleep_margin_ms = max(0.0, margin_ms)
+
+
+class RealClock:
+    """
+    perf_counter_ns() time, with precise sleep/spin waits. Safe to read from any thread.
+    """
+
+    virtual = False
+
+    @staticmethod
+    def now_ns() -> int:
+        return perf_counter_ns()
+
+    @staticmethod
+    def wait_until(deadline_ns: int, margin_ms: Optional[float] = None) -> int:
+        margin_ns = int((sleep_margin_ms if margin_ms is None else margin_ms) * NS_PER_MS)
+        now = perf_counter_ns()
+        remaining = deadline_ns - now
+        if remaining > margin_ns:
+            time.sleep((remaining - margin_ns) / 1e9)
+        while (now := perf_counter_ns()) < deadline_ns:
+            pass
+        return now
+
+
+class VirtualClock:
+    """
+    Simulated time for testing: starts at 0 and only moves when something waits, jumping straight to
+    the deadline. Callbacks registered with call_at()/call_every() (e.g. synthetic responses) run as time
+    passes them, in order, each seeing now_ns() equal to its own due time, so simulated sessions are
+    deterministic. Only the main thread should wait on a VirtualClock.
+    """
+
+    virtual = True
+
+    def __init__(self, start_ns: int = 0):
+        self._now_ns = start_ns
+        self._timers: list[tuple[int, int, Callable[[], None], Optional[int]]] = []
+        self._sequence = itertools.count()
+
+    def now_ns(self) -> int:
+        return self._now_ns
+
+    def wait_until(self, deadline_ns: int, margin_ms: Optional[float] = None) -> int:
+        while self._timers and self._timers[0][0] <= deadline_ns:
+            due, _, callback, interval_ns = heapq.heappop(self._timers)
+            self._now_ns = max(self._now_ns, due)
+            if interval_ns:
+                heapq.heappush(self._timers, (due + interval_ns, next(self._sequence), callback, interval_ns))
+            callback()
+        self._now_ns = max(self._now_ns, deadline_ns)
+        return self._now_ns
+
+    def advance(self, ms: float) -> int:
+        return self.wait_until(self._now_ns + int(ms * NS_PER_MS))
+
+    def call_at(self, t_ns: int, callback: Callable[[], None]):
+        heapq.heappush(self._timers, (t_ns, next(self._sequence), callback, None))
+
+    def call_every(self, interval_ms: float, callback: Callable[[], None]):
+        """
+        Call callback every interval_ms of simulated time, starting interval_ms from now.
+        """
+        interval_ns = max(1, int(interval_ms * NS_PER_MS))
+        heapq.heappush(self._timers, (self._now_ns + interval_ns, next(self._sequence), callback, interval_ns))
+
+
+clock: RealClock | VirtualClock = RealClock()
+
+
+def now_ns() -> int:
+    """
+    Current time of the session's clock in ns (an arbitrary origin, see SessionClock for session ms).
+    """
+    return clock.now_ns()
+
+
+def wait_until(deadline_ns: int, margin_ms: Optional[float] = None) -> int:
+    """
+    Return as soon as now_ns() reaches deadline_ns (returns that time).
+    """
+    return clock.wait_until(deadline_ns, margin_ms)
+
+
+def wait(ms: float, margin_ms: Optional[float] = None) -> int:
+    """
+    Wait precisely ms milliseconds, e.g. for an inter-trial interval.
+    """
+    return wait_until(now_ns() + int(ms * NS_PER_MS), margin_ms)
+
+
+class SessionClock:
+    """
+    Milliseconds since origin (by default, when the clock was created), from now_ns().
+    """
+
+    def __init__(self, origin_ns: Optional[int] = None):
+        self.origin_ns = now_ns() if origin_ns is None else origin_ns
+
+    def now(self) -> float:
+        return (now_ns() - self.origin_ns) / NS_PER_MS
+
+    def to_ms(self, t_ns: int) -> float:
+        """
+        Convert a now_ns() reading to session ms.
+        """
+        return (t_ns - self.origin_ns) / NS_PER_MS
+
+    def reset(self):
+        self.origin_ns = now_ns()
+
+
+session_clock = SessionClock()
+
+
+def now() -> float:
+    """
+    Current session time in ms.
+    """
+    return session_clock.now()
+
+
+def set_clock(new_clock: RealClock | VirtualClock):
+    """
+    Use new_clock for all times and waits from now on (e.g. VirtualClock() for a simulated session).
+    The session clock restarts at 0, so call this before anything is timestamped.
+    """
+    global clock
+    clock = new_clock
+    session_clock.reset()
+
+
+class FramePacer:
+    """
+    Replacement for pygame.time.Clock.tick(rate): wait() returns at fixed period_ms steps from start().
+    Deadlines are computed from the start time (not from the previous wait), so small delays don't accumulate.
+    After a frame that ran over by more than a whole period, pacing restarts from the current time instead
+    of rushing to catch up.
+    """
+
+    def __init__(self, period_ms: float):
+        self.period_ns = period_ms * NS_PER_MS
+        self.next_deadline_ns: Optional[int] = None
+        self._origin_ns = 0
+        self._periods = 0
+
+    def start(self, origin_ns: Optional[int] = None):
+        self._origin_ns = now_ns() if origin_ns is None else origin_ns
+        self._periods = 1
+        self.next_deadline_ns = self._origin_ns + round(self.period_ns)
+
+    def wait(self) -> int:
+        if self.next_deadline_ns is None:
+            self.start()
+        if now_ns() - self.next_deadline_ns > self.period_ns:
+            self.start()
+        now = wait_until(self.next_deadline_ns)
+        self._periods += 1
+        self.next_deadline_ns = self._origin_ns + round(self._periods * self.period_ns)
+        return now
@@ -0,0 +1,149 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Trial tables: a design (conditions with their stimuli and S-R mapping, crossed factors, repetitions)
+compiled into columns, one row per trial. Stimulus columns hold integer indices into TrialTable.media_names,
+so presenting trial i is a couple of array lookups and no per-trial objects are created. Results are written
+into preallocated columns of the same table, which then becomes the data file.
+"""
+
+from pathlib import Path
+from typing import Any, Callable, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class TrialTable:
+    def __init__(self, design: pd.DataFrame, media_names: Sequence[str], stimulus_columns: Sequence[str]):
+        self.design = design.reset_index(drop=True)
+        self.media_names = list(media_names)
+        self.stimulus_columns = list(stimulus_columns)
+        # numpy views of every design column, so per-trial access never goes through pandas indexing
+        self._columns: dict[str, np.ndarray] = {name: self.design[name].to_numpy() for name in self.design.columns}
+        self._results: dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.design)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        A design or result column as a numpy array (indexable by trial number).
+        """
+        return self._columns[name] if name in self._columns else self._results[name]
+
+    def media(self, column: str, trial: int) -> str:
+        """
+        Name of the media in stimulus column for trial, e.g. table.media("left", 3) -> "FF1BW".
+        """
+        return self.media_names[self._columns[column][trial]]
+
+    def record(self, trial: int, **values: Any):
+        """
+        Store result values for trial, e.g. table.record(i, response="A K", correct=True, rt=523.1).
+        Each result column is allocated for the whole table the first time it's used.
+        """
+        for name, value in values.items():
+            result = self._results.get(name)
+            if result is None:
+                if isinstance(value, (bool, np.bool_)):
+                    result = np.zeros(len(self), dtype=object)
+                    result[:] = None
+                elif isinstance(value, (int, float, np.number)):
+                    result = np.full(len(self), np.nan)
+                else:
+                    result = np.full(len(self), None, dtype=object)
+                self._results[name] = result
+            result[trial] = value
+
+    def row(self, trial: int) -> dict:
+        """
+        One trial's design and result values (stimuli by media name), e.g. for a datasink.DataSink.
+        """
+        row = {name: values[trial] for name, values in self._columns.items()}
+        for column in self.stimulus_columns:
+            row[column] = self.media_names[row[column]]
+        row.update({name: values[trial] for name, values in self._results.items()})
+        return row
+
+    def to_frame(self, media_names: bool = True) -> pd.DataFrame:
+        """
+        Design and result columns together. With media_names, stimulus indices are replaced by media names.
+        """
+        frame = self.design.copy()
+        if media_names:
+            names = np.asarray(self.media_names, dtype=object)
+            for column in self.stimulus_columns:
+                frame[column] = names[self._columns[column]]
+        for name, values in self._results.items():
+            frame[name] = values
+        return frame
+
+    def save(self, path: Path | str):
+        """
+        Write the table (with results so far) as CSV.
+        """
+        self.to_frame().to_csv(path, index=False)
+
+
+def compile_design(
+    conditions: Mapping[str, Sequence] | pd.DataFrame,
+    stimulus_columns: Sequence[str],
+    factors: Optional[Mapping[str, Sequence]] = None,
+    repetitions: int = 1,
+    order: Optional[Sequence[int] | Callable[[pd.DataFrame], Sequence[int]]] = None,
+) -> TrialTable:
+    """
+    Compile a design into a TrialTable.
+
+    conditions: one entry per condition for each column, e.g.
+        {"left": ["FF1BW", "FF2BW"], "right": ["HH1BW", "HH2BW"], "correct": ["A K", "S L"]}
+    stimulus_columns: which of those columns name media (stored as integer indices into media_names)
+    factors: extra factors fully crossed with the conditions, e.g. {"soa": [0, 100]}
+    repetitions: how many times the crossed design is repeated
+    order: optional trial order, a permutation of range(n_trials), or a function that returns one given the
+        compiled (unordered) design, e.g. lambda design: randomization.constrained_order(design["hand"], 3, seed=s)
+
+    Trials are ordered repetition by repetition, then condition, then factor levels (last factor varies fastest).
+    """
+    base = pd.DataFrame(conditions).reset_index(drop=True)
+    base.insert(0, "condition", np.arange(len(base)))
+
+    # cross conditions with factors, using index arithmetic rather than nested loops
+    factors = dict(factors or {})
+    levels = [len(values) for values in factors.values()]
+    n_cells = len(base) * int(np.prod(levels, dtype=int))
+    grid = np.indices([len(base), *levels]).reshape(len(levels) + 1, -1)
+    design = base.iloc[grid[0]].reset_index(drop=True)
+    for (name, values), index in zip(factors.items(), grid[1:]):
+        design[name] = np.asarray(values, dtype=object)[index]
+
+    design = pd.concat([design] * repetitions, ignore_index=True)
+    design.insert(0, "repetition", np.repeat(np.arange(repetitions), n_cells))
+
+    if callable(order):
+        order = order(design)
+    if order is not None:
+        design = design.iloc[np.asarray(order)].reset_index(drop=True)
+    design.insert(0, "trial", np.arange(len(design)))
+
+    # one shared index over all stimulus columns
+    codes, media_names = pd.factorize(pd.concat([design[column] for column in stimulus_columns], ignore_index=True))
+    for i, column in enumerate(stimulus_columns):
+        design[column] = codes[i * len(design) : (i + 1) * len(design)]
+
+    return TrialTable(design, list(media_names), stimulus_columns)
@@ -0,0 +1,149 @@
+"""
+This file is part of the exptbimanual source code.
+Copyright (C) 2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Stimulus variants (contrast, luminance, phase-scrambled, noisy versions of a stimulus set).
+Images are stacked into one (n_images, width, height) float array of luminance in [0, 1],
+so every manipulation is a handful of NumPy operations over the whole set at once.
+"""
+
+from typing import Any, Optional, Sequence
+
+import numpy as np
+import pygame
+import pygame.surfarray
+
+
+def to_luminance(surfaces: Sequence[pygame.Surface]) -> np.ndarray:
+    """
+    Stack same-sized surfaces into an (n, width, height) float32 array of luminance in [0, 1].
+    """
+    sizes = {surface.get_size() for surface in surfaces}
+    if len(sizes) > 1:
+        raise ValueError(f"Stimulus variants need same-sized images, got sizes {sorted(sizes)}")
+    rgb = np.stack([pygame.surfarray.array3d(surface) for surface in surfaces]).astype(np.float32)
+    return rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32) / 255.0
+
+
+def to_surfaces(images: np.ndarray) -> list[pygame.Surface]:
+    """
+    Inverse of to_luminance(): (n, width, height) luminance in [0, 1] -> grayscale surfaces
+    (in the display's format if possible).
+    """
+    gray = np.round(np.clip(images, 0.0, 1.0) * 255.0).astype(np.uint8)
+    rgb = np.repeat(gray[..., np.newaxis], 3, axis=-1)
+    surfaces = [pygame.surfarray.make_surface(image) for image in rgb]
+    if pygame.display.get_surface() is not None:
+        surfaces = [surface.convert() for surface in surfaces]
+    return surfaces
+
+
+def scale_contrast(images: np.ndarray, factor: float) -> np.ndarray:
+    """
+    Scale each image's deviations from its own mean luminance by factor (0 = flat gray, 1 = unchanged).
+    """
+    means = images.mean(axis=(1, 2), keepdims=True)
+    return means + factor * (images - means)
+
+
+def match_luminance(images: np.ndarray, mean: Optional[float] = None, std: Optional[float] = None) -> np.ndarray:
+    """
+    Give every image the same mean luminance and RMS contrast (std). Targets default to the set averages.
+    """
+    means = images.mean(axis=(1, 2), keepdims=True)
+    stds = images.std(axis=(1, 2), keepdims=True)
+    target_mean = means.mean() if mean is None else mean
+    target_std = stds.mean() if std is None else std
+    return (images - means) / np.where(stds > 0, stds, 1.0) * target_std + target_mean
+
+
+def phase_scramble(images: np.ndarray, amount: float = 1.0, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Add random phase (scaled by amount, 1 = fully scrambled) to each image's Fourier spectrum,
+    keeping its amplitude spectrum (and mean luminance). Produces the usual phase-scrambled masks at amount=1.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    spectrum = np.fft.fft2(images, axes=(1, 2))
+    # the phase of white noise's spectrum is conjugate-symmetric, so the result stays real
+    random_phase = np.angle(np.fft.fft2(rng.random(images.shape), axes=(1, 2)))
+    scrambled = np.abs(spectrum) * np.exp(1j * (np.angle(spectrum) + amount * random_phase))
+    return np.real(np.fft.ifft2(scrambled, axes=(1, 2))).astype(np.float32)
+
+
+def add_noise(images: np.ndarray, sigma: float, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Add Gaussian luminance noise with standard deviation sigma (in [0, 1] luminance units).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    return images + rng.normal(0.0, sigma, images.shape).astype(np.float32)
+
+
+class StimulusVariants:
+    """
+    Variants of a set of same-sized stimuli from a media store, e.g.:
+
+        faces = StimulusVariants(setup.media, ["FF1BW", "FF2BW", "FF3BW"])
+        low_contrast = faces.variant(contrast=0.25, match_mean=0.5)   # {"FF1BW": Surface, ...}
+        masks = faces.variant(scramble=1.0, seed=7)
+
+    Each distinct parameter set is computed once over the whole set and cached.
+    Manipulations are applied in the order: luminance matching, contrast, phase scrambling, noise.
+    """
+
+    def __init__(self, media: Any, names: Sequence[str]):
+        self.media = media
+        self.names = list(names)
+        self._base: Optional[np.ndarray] = None
+        self._cache: dict[tuple, dict[str, pygame.Surface]] = {}
+
+    @property
+    def base(self) -> np.ndarray:
+        if self._base is None:
+            self._base = to_luminance([self.media[name] for name in self.names])
+        return self._base
+
+    def variant(
+        self,
+        contrast: float = 1.0,
+        match_mean: Optional[float] = None,
+        match_std: Optional[float] = None,
+        match: bool = False,
+        scramble: float = 0.0,
+        noise: float = 0.0,
+        seed: int = 0,
+    ) -> dict[str, pygame.Surface]:
+        """
+        Return {name: surface} for the given parameters. Luminance matching is applied when match is True or
+        when match_mean/match_std is given. seed makes scrambling and noise reproducible.
+        """
+        key = (contrast, match_mean, match_std, match, scramble, noise, seed)
+        if key not in self._cache:
+            images = self.base
+            if match or match_mean is not None or match_std is not None:
+                images = match_luminance(images, match_mean, match_std)
+            if contrast != 1.0:
+                images = scale_contrast(images, contrast)
+            rng = np.random.default_rng(seed)
+            if scramble:
+                images = phase_scramble(images, scramble, rng)
+            if noise:
+                images = add_noise(images, noise, rng)
+            self._cache[key] = dict(zip(self.names, to_surfaces(images)))
+        return self._cache[key]
+
+    def clear_cache(self):
+        self._cache.clear()
+        self._base = None
@@ -16,16 +16,30 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import argparse
+import os
 import platform
 import sys
 import threading
+import time
+from dataclasses import asdict
 from types import SimpleNamespace
 
 
 import pygame
 from rich import print
 
-from exptbimanual.exptsys.response import find_devices, input_thread, stop_event
+from exptbimanual.exptsys.display import open_display
+from exptbimanual.exptsys.profiler import FrameProfiler
+from exptbimanual.exptsys import audio, datasink, runner, timing
+from exptbimanual.exptsys.capture import FrameCapture
+from exptbimanual.exptsys.response import (
+    find_devices,
+    input_thread,
+    stop_event,
+    synthetic_input_thread,
+    synthetic_responder,
+)
 from exptbimanual.version import __version__
 from exptbimanual.apputils import frozen, stop_if_not_linux, set_qt_platform
 
@@ -35,46 +49,205 @@ OS = platform.system()
 set_qt_platform()
 
 
-def main():
-    print(f"Bimanual Experiment Version {__version__} | {OS=} | {frozen()=}")
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="exptbimanual", description="Bimanual task replication of Schumacher et al 2018."
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Run without a window or audio device (SDL dummy drivers) using synthetic responses. "
+        "Useful for profiling and CI.",
+    )
+    parser.add_argument("--subid", type=str, default=None, help="Participant ID (skips the setup dialog)")
+    parser.add_argument("--session", type=str, default=None, help="Session # (skips the setup dialog)")
+    parser.add_argument(
+        "--response-interval",
+        type=int,
+        default=250,
+        help="In headless mode, ms between synthetic responses (default: 250)",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="In headless mode, seed for synthetic responses")
+    parser.add_argument(
+        "--virtual-clock",
+        action="store_true",
+        help="In headless mode, simulate time: every wait returns at once, so a whole session runs in seconds",
+    )
+    sound = parser.add_argument_group("audio (chosen before pygame.init())")
+    sound.add_argument("--audio-rate", type=int, default=None, help="Mixer sample rate in Hz (default: 48000)")
+    sound.add_argument(
+        "--audio-buffer",
+        type=int,
+        default=None,
+        help="Mixer buffer in samples, rounded up to a power of two of at least 256 (default: 256)",
+    )
+    sound.add_argument("--audio-channels", type=int, default=None, help="Mixer output channels (default: 2)")
+    capture = parser.add_argument_group("stimulus auditing")
+    capture.add_argument(
+        "--capture",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Save the first frame of each loop to DIR/frames_<subid>_<session>",
+    )
+    capture.add_argument("--capture-scale", type=float, default=1.0, help="Downsample captured frames by this factor")
+    capture.add_argument("--capture-archive", action="store_true", help="Store captured frames in one zip archive")
+    profiling = parser.add_argument_group("profiling")
+    profiling.add_argument(
+        "--profile", action="store_true", help="Time each phase of every frame and print a summary at exit"
+    )
+    display = parser.add_argument_group("display mode (unavailable modes fall back to simpler ones)")
+    display.add_argument("--fullscreen", action="store_true", default=None, help="Request a fullscreen display")
+    display.add_argument("--scaled", action="store_true", default=None, help="Request pygame's SCALED renderer")
+    display.add_argument("--vsync", action="store_true", default=None, help="Request flips synchronized to refresh")
+    display.add_argument("--doublebuf", action="store_true", default=None, help="Request a double-buffered display")
+    args = parser.parse_args(argv)
+    if args.virtual_clock and not args.headless:
+        parser.error("--virtual-clock requires --headless")
+    return args
+
+
+def main(argv: list[str] | None = None):
+    args = parse_args(argv)
+
+    print(f"Bimanual Experiment Version {__version__} | {OS=} | {frozen()=} | headless={args.headless}")
 
     stop_if_not_linux("ExptBimanual")
 
+    if args.headless:
+        # must be in place before pygame.init() so SDL picks the offscreen backends
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+    if args.virtual_clock:
+        # must be in place before anything is timestamped
+        timing.set_clock(timing.VirtualClock())
+    real_start = time.perf_counter()
+
     # Parameter Setup
     # ---------------
-    parameters = task_setup.get_parameters()
+    if args.subid is not None and args.session is not None:
+        parameters = {"subid": args.subid, "session": args.session}
+    elif args.headless:
+        parameters = {"subid": args.subid or "0", "session": args.session or "1"}
+    else:
+        parameters = task_setup.get_parameters()
     if not parameters:
         sys.exit()
 
     # setup.options is a SimpleNamespace, parameters is a dict.
     # this expression create a merged dict out of both and then re-constitutes the SimpleNamespace
     task_setup.options = SimpleNamespace(**(task_setup.options.__dict__ | parameters))
+    for name in ("fullscreen", "scaled", "vsync", "doublebuf"):
+        if getattr(args, name):
+            setattr(task_setup.options, name, True)
+    for name in ("audio_rate", "audio_buffer", "audio_channels"):
+        if getattr(args, name) is not None:
+            setattr(task_setup.options, name, getattr(args, name))
     print(task_setup.options)
 
     # Setup Pygame
     # ------------
+    audio.configure_mixer(
+        frequency=task_setup.options.audio_rate,
+        channels=task_setup.options.audio_channels,
+        buffer=task_setup.options.audio_buffer,
+    )
     pygame.mixer.init()
     pygame.init()
-    screen = pygame.display.set_mode(task_setup.options.screen_size)
+    task_setup.options.audio = audio.mixer_info()
+    print(task_setup.options.audio)
+    screen, display_mode = open_display(
+        task_setup.options.screen_size,
+        fullscreen=task_setup.options.fullscreen,
+        scaled=task_setup.options.scaled,
+        vsync=task_setup.options.vsync,
+        doublebuf=task_setup.options.doublebuf,
+    )
+    print(display_mode)
+
+    # with vsync, flips are locked to the measured refresh. otherwise the loop is paced by timing.FramePacer
+    # at the reported or probed refresh rate
+    if display_mode.vsync_effective:
+        runner.configure_frame_timing(display_mode.refresh_interval_ms, synced=True)
+    elif display_mode.frame_period_ms:
+        runner.configure_frame_timing(display_mode.frame_period_ms, synced=False)
+    else:
+        print(
+            "[bold yellow]WARNING: the refresh rate is unknown, so durations are not locked to frames "
+            "and frames are paced at 60 Hz[/bold yellow]"
+        )
+
+    # keep a record of the mode actually used with the session parameters
+    task_setup.options.display_mode = asdict(display_mode) | {
+        "frame_period_ms": runner.frame_period_ms,
+        "durations_frame_locked": runner.frame_period_ms is not None and runner.lock_durations_to_frames,
+    }
+
+    # session settings (e.g., the display mode actually used and the mixer's buffer latency) are kept with
+    # the trial data, so a run can be audited afterwards
+    session_info = datasink.save_json(
+        datasink.session_file(
+            task_setup.options.data_dir,
+            "session",
+            task_setup.options.subid,
+            task_setup.options.session,
+            suffix=".json",
+        ),
+        {
+            "version": __version__,
+            "subid": task_setup.options.subid,
+            "session": task_setup.options.session,
+            "display_mode": task_setup.options.display_mode,
+            "audio": task_setup.options.audio,
+        },
+    )
+    print(f"Session settings written to {session_info}")
+
+    timing.set_sleep_margin(task_setup.options.sleep_margin_ms)
+
     pygame.display.set_caption("")
+
+    if args.capture:
+        runner.set_frame_capture(
+            FrameCapture(
+                args.capture,
+                scale=args.capture_scale,
+                archive=args.capture_archive,
+                name=f"frames_{task_setup.options.subid}_{task_setup.options.session}",
+            )
+        )
+    if args.profile:
+        runner.set_frame_profiler(FrameProfiler())
     clock = pygame.time.Clock()
 
     # setup input device handling
     # ---------------------------
-    # Query system for appropriate input devices
     input_threads = []
-    input_devices = find_devices(
-        include_keyboards=task_setup.options.keyboard_input, include_mice=task_setup.options.mouse_input
-    )
-    # Announce input device list
-    print("Found these EV_KEY devices:")
-    for dev in input_devices:
-        print(f" • {dev.path}  → {dev.name}")
-    # Spawn one thread per input device
-    for dev in input_devices:
-        t = threading.Thread(target=input_thread, args=(dev, stop_event), daemon=True)
+    if args.virtual_clock:
+        # synthetic responses arrive on the simulated timeline, no thread needed
+        timing.clock.call_every(args.response_interval, synthetic_responder(args.seed))
+    elif args.headless:
+        # no real devices in headless mode, responses are generated instead
+        t = threading.Thread(
+            target=synthetic_input_thread, args=(stop_event, args.response_interval, args.seed), daemon=True
+        )
         t.start()
-        input_threads.append((t, dev))
+        input_threads.append((t, None))
+    else:
+        # Query system for appropriate input devices
+        input_devices = find_devices(
+            include_keyboards=task_setup.options.keyboard_input, include_mice=task_setup.options.mouse_input
+        )
+        # Announce input device list
+        print("Found these EV_KEY devices:")
+        for dev in input_devices:
+            print(f" • {dev.path}  → {dev.name}")
+        # Spawn one thread per input device
+        for dev in input_devices:
+            t = threading.Thread(target=input_thread, args=(dev, stop_event), daemon=True)
+            t.start()
+            input_threads.append((t, dev))
 
     try:
         # hide mouse cursor, though will still track button presses if enabled in find_devices
@@ -88,14 +261,20 @@ def main():
     except KeyboardInterrupt:
         print("KeyboardInterrupt: Shutting Down.")
     finally:
-        # indicate waiting state using cursor
-        pygame.mouse.set_visible(True)
-        wait_cursor = pygame.cursors.Cursor(pygame.SYSTEM_CURSOR_WAIT)
-        pygame.mouse.set_cursor(wait_cursor)
-        cx = screen.get_width() // 2
-        cy = screen.get_height() // 2
-        pygame.mouse.set_pos((cx, cy))
-        pygame.display.update()  # force the cursor change to appear immediately
+        # indicate waiting state using cursor (the dummy video driver has no system cursors)
+        if not args.headless:
+            pygame.mouse.set_visible(True)
+            wait_cursor = pygame.cursors.Cursor(pygame.SYSTEM_CURSOR_WAIT)
+            pygame.mouse.set_cursor(wait_cursor)
+            cx = screen.get_width() // 2
+            cy = screen.get_height() // 2
+            pygame.mouse.set_pos((cx, cy))
+            pygame.display.update()  # force the cursor change to appear immediately
+
+        # write out any trial data still queued (e.g., after Ctrl+X)
+        for sink in datasink.close_all():
+            lost = sink.queued - sink.written
+            print(f"[bold red]WARNING: {lost} records not written to {sink.path}: {sink.errors}[/bold red]")
 
         print("Stopping input threads...")
         stop_event.set()
@@ -103,8 +282,25 @@ def main():
             t.join(timeout=1.0)
 
         # restore default mouse cursor
-        arrow_cursor = pygame.cursors.Cursor(pygame.SYSTEM_CURSOR_ARROW)
-        pygame.mouse.set_cursor(arrow_cursor)
+        if not args.headless:
+            arrow_cursor = pygame.cursors.Cursor(pygame.SYSTEM_CURSOR_ARROW)
+            pygame.mouse.set_cursor(arrow_cursor)
+
+        # finish writing any captured frames
+        if runner.frame_capture is not None:
+            runner.frame_capture.close()
+            print(
+                f"Captured {runner.frame_capture.captured} frames ({runner.frame_capture.dropped} dropped) "
+                f"to {runner.frame_capture.target}"
+            )
+
+        if runner.frame_profiler is not None:
+            print("Frame profile")
+            print("-------------")
+            print(runner.frame_profiler.report())
+
+        if args.virtual_clock:
+            print(f"Simulated {timing.now() / 1000:.1f} s of session in {time.perf_counter() - real_start:.1f} s")
 
         # shutdown pygame
         pygame.quit()
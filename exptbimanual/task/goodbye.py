@@ -61,6 +61,7 @@ def run(screen: pygame.surface):
         duration=30000,
         wait_for_responses=1,
         responses_allowed=["SPACE"],
+        record=True,
     )
 
     # DEBUG
@@ -64,6 +64,7 @@ def run(screen: pygame.surface):
         duration=5000,
         wait_for_responses=1,
         responses_allowed=["SPACE"],
+        record=True,
     )
 
     # DEBUG
@@ -16,20 +16,36 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from types import SimpleNamespace
+from functools import lru_cache, partial
 
 import pygame
 
 import exptbimanual.task.task_setup as setup
+from exptbimanual.exptsys import audio, randomization
+from exptbimanual.exptsys.datasink import DataSink, session_file
 from exptbimanual.exptsys.keyboardsurface import keyboard_surface
-from exptbimanual.exptsys.pygame_utils import scale_surface
-from exptbimanual.exptsys.runner import run_loop
-from exptbimanual.exptsys.stimulus import return_partial, draw_image, draw_text, play_sound
+from exptbimanual.exptsys.stimulus import return_partial, draw_image, draw_text, Scene
+from exptbimanual.exptsys.timeline import Timeline
+from exptbimanual.exptsys.trialtable import compile_design
 
 # Other globals
 screen_width, screen_height = setup.options.screen_size
 screen_center: tuple[int, int] = (screen_width // 2, screen_height // 2)
-scratchpad: dict = {}
+
+# one entry per trial type: left and right image, and the key(s) that must be pressed together
+PRACTICE_DESIGN = {
+    "left": ["FF1BW", "FF2BW", "FF3BW", "FF1BW"],
+    "right": ["HH1BW", "HH2BW", "HH1BW", "HH3BW"],
+    "correct_keys": ["A K", "S L", "K", "A"],
+    "hand": ["both", "both", "right", "left"],
+}
+
+
+def block_stimuli() -> list[str]:
+    """
+    Names of all media used in this block, e.g. for setup.media.prefetch()
+    """
+    return sorted(set(PRACTICE_DESIGN["left"]) | set(PRACTICE_DESIGN["right"]))
 
 
 @return_partial
@@ -48,6 +64,40 @@ def draw_fixation(screen: pygame.Surface) -> dict:
     return data
 
 
+def draw_pics(screen: pygame.Surface, left_pic: pygame.Surface, right_pic: pygame.Surface):
+    # Show 2 Images
+    center_x, center_y = screen_center
+    image_offset_x = 150
+    draw_image(screen=screen, image=left_pic, position=(center_x - image_offset_x, center_y))
+    draw_image(screen=screen, image=right_pic, position=(center_x + image_offset_x, center_y))
+
+
+@lru_cache(maxsize=8)
+def practice_scene(left_pic: pygame.Surface, right_pic: pygame.Surface) -> Scene:
+    """
+    Fixation and both images never change during a trial, so they're composed once per stimulus pair
+    """
+    return (
+        Scene((screen_width, screen_height), fill_color=setup.options.bg_color)
+        .add_static(partial(draw_text, text="+", position=screen_center, color="white", font=("Arial", 40)))
+        .add_static(partial(draw_pics, left_pic=left_pic, right_pic=right_pic))
+    )
+
+
+@lru_cache(maxsize=8)
+def feedback_scene(keys: tuple[str, ...], left_pic: pygame.Surface, right_pic: pygame.Surface) -> Scene:
+    keyboard = keyboard_surface(" ".join(keys), scale=0.5)
+    return (
+        Scene((screen_width, screen_height), fill_color=setup.options.bg_color)
+        .add_static(partial(draw_pics, left_pic=left_pic, right_pic=right_pic))
+        .add_static(
+            partial(
+                draw_image, image=keyboard, position=(screen_center[0], screen_height - keyboard.get_height() // 2 - 50)
+            )
+        )
+    )
+
+
 @return_partial
 def draw_feedback(
     screen: pygame.Surface,
@@ -55,10 +105,12 @@ def draw_feedback(
     correct: bool,
     left_pic: pygame.Surface,
     right_pic: pygame.Surface,
-    scratch: dict,
 ) -> dict:
     data = {}
 
+    # images and keyboard come from the cached scene, only the feedback text is drawn per frame
+    feedback_scene(tuple(keys), left_pic, right_pic).draw(screen)
+
     draw_text(
         screen=screen,
         text="CORRECT!" if correct else "Incorrect.",
@@ -68,23 +120,6 @@ def draw_feedback(
         center_on_position=True,
     )
 
-    # Show 2 Images
-    center_x, center_y = screen_center
-    image_offset_x = 150
-    draw_image(screen=screen, image=left_pic, position=(center_x - image_offset_x, center_y))
-    draw_image(screen=screen, image=right_pic, position=(center_x + image_offset_x, center_y))
-
-    keyboard = scale_surface(keyboard_surface(" ".join(keys)), scale_factor=0.5)
-    draw_image(
-        screen=screen, image=keyboard, position=(screen_center[0], screen_height - keyboard.get_height() // 2 - 50)
-    )
-
-    # NOTE: this isn't working
-    # play sound once by setting a flag in the scratch dict
-    if not scratch["feedback_played_sound"]:
-        play_sound(sound=setup.media.beep_high if correct else setup.media.beep_low, wait=True, volume=0.2)
-        scratch["feedback_played_sound"] = True
-
     return data
 
 
@@ -92,21 +127,8 @@ def draw_feedback(
 def draw_practice_screen(screen: pygame.Surface, left_pic: pygame.Surface, right_pic: pygame.Surface) -> dict:
     data = {}
 
-    # Show fixation
-    draw_text(
-        screen=screen,
-        text="+",
-        position=screen_center,
-        color="white",
-        font=("Arial", 40),
-        center_on_position=True,
-    )
-
-    # Show 2 Images
-    center_x, center_y = screen_center
-    image_offset_x = 150
-    draw_image(screen=screen, image=left_pic, position=(center_x - image_offset_x, center_y))
-    draw_image(screen=screen, image=right_pic, position=(center_x + image_offset_x, center_y))
+    # Show fixation and 2 Images
+    practice_scene(left_pic, right_pic).draw(screen)
 
     return data
 
@@ -115,60 +137,112 @@ def run(screen: pygame.surface):
     """
     This currently isn't any real task, I just made these trials up as a demo
     """
-    global scratchpad
-
     screen.fill("black")
     pygame.display.flip()
 
-    practice_data: list[dict] = []
+    # 8 total trials for testing, in a random order (fixed per participant and session) with no more than
+    # 2 trials in a row for the same hand(s)
+    rng = randomization.participant_seed(setup.options.subid, setup.options.session)
+    trials = compile_design(
+        PRACTICE_DESIGN,
+        stimulus_columns=["left", "right"],
+        repetitions=2,
+        order=lambda design: randomization.constrained_order(design["hand"], max_run=2, rng=rng),
+    )
+    correct_keys = trials.column("correct_keys")
+
+    # fixation and feedback have fixed lengths, the practice screen lasts until a response
+    timeline = Timeline(
+        [("fixation", 1000), ("practice_screen", None), ("feedback", 4000)] * len(trials),
+        absolute=setup.options.absolute_timeline,
+    )
+    # each trial is appended to the data file as soon as it ends
+    sink = DataSink(
+        session_file(
+            setup.options.data_dir,
+            "practice",
+            setup.options.subid,
+            setup.options.session,
+            suffix=f".{setup.options.data_format}",
+        )
+    )
 
-    trial_types = [
-        SimpleNamespace(stims=["FF1BW", "HH1BW"], pics=[setup.media.FF1BW, setup.media.HH1BW], correct=["A", "K"]),
-        SimpleNamespace(stims=["FF2BW", "HH2BW"], pics=[setup.media.FF2BW, setup.media.HH2BW], correct=["S", "L"]),
-        SimpleNamespace(stims=["FF3BW", "HH1BW"], pics=[setup.media.FF3BW, setup.media.HH1BW], correct=["K"]),
-        SimpleNamespace(stims=["FF1BW", "HH3BW"], pics=[setup.media.FF1BW, setup.media.HH3BW], correct=["A"]),
-    ]
+    timeline.start()
 
-    # 8 total trials for testing
-    all_trials = trial_types * 2
+    for i in range(len(trials)):
+        left_pic = setup.media[trials.media("left", i)]
+        right_pic = setup.media[trials.media("right", i)]
+        keys = correct_keys[i].split()
 
-    for trial in all_trials:
-        _ = run_loop(screen, draw_fixation(screen), duration=1000)
+        _ = timeline.run("fixation", screen, draw_fixation(screen), record=True)
 
-        result = run_loop(
+        result = timeline.run(
+            "practice_screen",
             screen,
-            draw_practice_screen(screen, trial.pics[0], trial.pics[1]),
+            draw_practice_screen(screen, left_pic, right_pic),
             wait_for_responses=1,  # seems odd, but I either want 1 resp or 2 SIMULTANEOUS responses
             responses_allowed=list("ASKL"),
-            correct_responses=trial.correct,
+            correct_responses=keys,
             exact_match=True,
+            fill_color=None,  # scene covers the whole screen
+            record=True,
+        )
+        correct = result.correct
+        trials.record(
+            i,
+            response=" ".join(sorted(result.response_values())),
+            correct=correct,
+            rt=result.first_rt,
+            last_rt=result.last_rt,
+            anticipations=len(result.anticipations),  # keys pressed before the images appeared
+            duration=result.duration,
+        )
+
+        # made here rather than by play(), so its onset can be stored with the trial
+        beep = audio.PlaybackRecord(
+            sound=setup.media.beep_high if correct else setup.media.beep_low,
+            volume=0.2,
+            at="flip",
+            label="beep_high" if correct else "beep_low",
         )
-        practice_data.append(result)
-
-        # e.g.:
-        # result=[
-        #     {'display_func': 'draw_practice_screen', 'loop_start': 1975, 'stop': 2522, 'duration': 547,
-        #      'responses': {
-        #          InputRecord(type="keyboard", device="Kinesis Freestyle Edge Keyboard", key=A, time=29976.932),
-        #          InputRecord(type="keyboard", device="Kinesis Freestyle Edge Keyboard", key=L, time=29976.934)
-        #      }, 'correct_responses': ['A', 'K'], 'correct': False}]
-
-        scratchpad["feedback_played_sound"] = False
-        _ = run_loop(
+        feedback = timeline.run(
+            "feedback",
             screen,
             draw_feedback(
                 screen=screen,
-                keys=trial.correct,
-                correct="correct" in result and result["correct"],
-                left_pic=trial.pics[0],
-                right_pic=trial.pics[1],
-                scratch=scratchpad,
+                keys=keys,
+                correct=correct,
+                left_pic=left_pic,
+                right_pic=right_pic,
             ),
-            duration=4000,
+            fill_color=None,  # scene covers the whole screen
+            record=True,
+            # the sound plays once, as the feedback appears
+            on_enter=partial(audio.scheduler.schedule, beep),
         )
+        trials.record(
+            i,
+            feedback_onset=feedback.onset,
+            beep_started=beep.started,
+            beep_onset=beep.onset,  # started + mixer buffer latency
+        )
+        sink.write(trials.row(i))
+
+    if sink.close():
+        print(f"Practice data written to {sink.path}")
+    else:
+        print(
+            f"WARNING: only {sink.written} of {sink.queued} practice trials were written to {sink.path}: "
+            f"{'; '.join(sink.errors) or 'writer stopped'}"
+        )
+
+    # planned vs. actual onset (drift) of every phase, next to the trial data
+    timeline_path = sink.path.with_name(f"{sink.path.stem}_timeline.csv")
+    timeline.to_frame().to_csv(timeline_path, index=False)
+    print(f"Practice timeline written to {timeline_path}")
 
     # DEBUG
     print("PRACTICE DATA")
     print("-------------")
-    for i, data in enumerate(practice_data):
-        print(f"{i}. {data}")
+    print(trials.to_frame().to_string(index=False))
+    print(f"Timeline: {timeline.summary()}")
@@ -136,8 +136,8 @@ def sr_pairs_screen(screen: pygame.Surface) -> dict:
         font=("Arial", 38),
     )
 
-    # can convert SimpleNamespace to dict when accessing via str index is preferable
-    sm = setup.media.__dict__
+    # media can also be accessed via str index when that is preferable
+    sm = setup.media
 
     sr_pairs = [
         SimpleNamespace(pics=[sm["FF1BW"], sm["HH1BW"]], responses=["A", "K"]),
@@ -189,6 +189,7 @@ def run(screen: pygame.surface):
         welcome_screen(screen),
         wait_for_responses=1,
         responses_allowed=["SPACE"],
+        record=True,
     )
 
     one_key_practice_result = run_loop(
@@ -196,6 +197,7 @@ def run(screen: pygame.surface):
         one_key_practice_screen(screen),
         wait_for_responses=1,
         responses_allowed=list("ASKL"),
+        record=True,
     )
 
     two_key_practice_result = run_loop(
@@ -205,6 +207,7 @@ def run(screen: pygame.surface):
         responses_allowed=list("ASKL"),
         correct_responses=list("AK"),
         exact_match=True,
+        record=True,
     )
 
     sr_pair_screen_result = run_loop(
@@ -212,6 +215,7 @@ def run(screen: pygame.surface):
         sr_pairs_screen(screen),
         wait_for_responses=1,
         responses_allowed=["SPACE"],
+        record=True,
     )
 
     # DEBUG
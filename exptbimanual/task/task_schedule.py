@@ -18,10 +18,14 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import pygame
 
+import exptbimanual.task.task_setup as setup
 from exptbimanual.task import goodbye, practice, practice_instructions, overview_instructions
 
 
 def run(screen: pygame.Surface):
+    # decode the practice stimuli in the background while the instructions are up
+    setup.media.prefetch(practice.block_stimuli())
+
     overview_instructions.run(screen)
     practice_instructions.run(screen)
     practice.run(screen)
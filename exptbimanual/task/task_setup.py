@@ -16,43 +16,70 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from pathlib import Path
 from types import SimpleNamespace
 
-import FreeSimpleGUIQt as sg
 import pygame
 from fastnumbers import isfloat
 
 from exptbimanual.apputils import set_qt_platform
+from exptbimanual.exptsys.assets import load_images
+from exptbimanual.exptsys.media import MediaStore
 from exptbimanual.resource import get_resource
 
 building_files = [f"HH{i + 1}BW.bmp" for i in range(6)]
 face_files = [f"FF{i + 1}BW.bmp" for i in range(6)]
-media = SimpleNamespace()
+media = MediaStore()
 
 options: SimpleNamespace = SimpleNamespace(
-    bg_color="black", screen_size=(1024, 768), practice_blocks=1, test_blocks=1, keyboard_input=True, mouse_input=False
+    bg_color="black",
+    screen_size=(1024, 768),
+    practice_blocks=1,
+    test_blocks=1,
+    keyboard_input=True,
+    mouse_input=False,
+    fullscreen=False,
+    scaled=False,
+    vsync=False,
+    doublebuf=False,
+    audio_rate=48000,
+    audio_buffer=256,  # samples, i.e. ~5 ms of latency at 48 kHz
+    audio_channels=2,
+    lazy_media=True,  # load images on first use instead of all at startup
+    media_budget_mb=256,  # least-recently-used images are evicted beyond this
+    data_dir="data",  # trial data files are written here
+    data_format="csv",  # "csv" or "jsonl"
+    sleep_margin_ms=2.0,  # precise waits sleep until this long before a deadline, then spin
+    absolute_timeline=True,  # end fixed-length phases at precomputed session times, so setup time doesn't add up
 )
 
 
 def preload_experiment_media():
     global media
-    for file in building_files:
-        setattr(media, Path(file).stem, pygame.image.load(get_resource("images", "buildings", file)).convert_alpha())
-    for file in face_files:
-        setattr(media, Path(file).stem, pygame.image.load(get_resource("images", "faces", file)).convert_alpha())
+    media.budget_bytes = int(options.media_budget_mb * 1024 * 1024)
+
+    image_files = [get_resource("images", "buildings", file) for file in building_files] + [
+        get_resource("images", "faces", file) for file in face_files
+    ]
+    if options.lazy_media:
+        media.register_images(image_files)
+    else:
+        for name, image in load_images(image_files).items():
+            setattr(media, name, image)
 
     media.beep_high = pygame.mixer.Sound(get_resource("sounds", "beep-high.wav"))
     media.beep_low = pygame.mixer.Sound(get_resource("sounds", "beep-low.wav"))
 
-    print("Successfully preloaded media:")
-    print(list(vars(media).keys()))
+    print("Successfully preloaded media:" if not options.lazy_media else "Successfully registered media:")
+    print(media.keys())
 
 
 def get_parameters() -> dict:
     """
     A task specific dialog to obtain whatever session parameters are needed
     """
+    # imported here so that headless runs don't need a Qt platform
+    import FreeSimpleGUIQt as sg
+
     font = ("Arial", 14)
     layout = [
         [sg.Text("Participant ID", font=font), sg.Input(key="subid", default_text="0", enable_events=True, font=font)],
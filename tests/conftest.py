@@ -0,0 +1,25 @@
+import os
+
+# offscreen SDL backends, set before pygame initialises anything
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import pytest
+
+from exptbimanual.exptsys import timing
+
+
+@pytest.fixture
+def virtual_clock():
+    clock = timing.VirtualClock()
+    timing.set_clock(clock)
+    yield clock
+    timing.set_clock(timing.RealClock())
+
+
+@pytest.fixture
+def screen():
+    pygame.display.init()
+    yield pygame.display.set_mode((64, 48))
+    pygame.display.quit()
@@ -0,0 +1,82 @@
+from functools import partial
+
+import pygame
+import pytest
+
+from exptbimanual.exptsys import audio, timing
+from exptbimanual.exptsys.runner import run_loop
+from exptbimanual.exptsys.stimulus import return_partial
+
+
+@return_partial
+def blank(screen) -> dict:
+    return {}
+
+
+@pytest.mark.parametrize("requested, used", [(1, 256), (128, 256), (256, 256), (300, 512), (1024, 1024), (1025, 2048)])
+def test_effective_buffer_matches_pygame_rounding(requested, used):
+    assert audio.effective_buffer(requested) == used
+
+
+@pytest.fixture
+def mixer(screen):
+    # events are posted when sounds finish, so the display (video) is needed too
+    audio.configure_mixer(buffer=256)
+    pygame.mixer.init()
+    yield
+    pygame.mixer.quit()
+
+
+def test_sounds_start_at_flip_or_at_their_time(virtual_clock, mixer):
+    scheduler = audio.AudioScheduler(reserved_channels=2)
+    beep = audio.tone(440, 100)
+    on_flip = scheduler.play(beep, at="flip")
+    later = scheduler.play(beep, at=50.0)
+
+    scheduler.update()
+    assert on_flip.started is None and later.started is None
+    scheduler.on_flip()
+    assert on_flip.started == 0.0
+
+    virtual_clock.advance(60)
+    scheduler.update()
+    assert later.started == 60.0
+    assert later.onset == later.started + audio.mixer_info()["buffer_latency_ms"]
+
+
+def test_finished_sounds_are_reported(virtual_clock, mixer):
+    scheduler = audio.AudioScheduler(reserved_channels=2)
+    done = []
+    pygame.event.clear()
+    record = scheduler.play(audio.tone(440, 100), on_done=done.append)
+
+    virtual_clock.advance(50)
+    scheduler.update()
+    assert done == [] and scheduler.busy()
+
+    virtual_clock.advance(100)
+    scheduler.update()
+    assert done == [record] and record.finished == 150.0
+    assert [event.playback for event in pygame.event.get(audio.SOUND_DONE)] == [record]
+    assert not scheduler.busy()
+
+
+def test_busy_channels_are_reused(virtual_clock, mixer):
+    scheduler = audio.AudioScheduler(reserved_channels=2)
+    long_tone = audio.tone(440, 2000)
+    scheduler.play(long_tone)
+    scheduler.play(long_tone)
+    # over in simulated time, but still playing on the (real-time) mixer
+    virtual_clock.advance(3000)
+    scheduler.update()
+    assert scheduler.play(long_tone).channel is not None
+
+
+def test_loop_without_a_flip_cancels_its_flip_sounds(virtual_clock, mixer, screen):
+    beep = audio.PlaybackRecord(sound=audio.tone(440, 100), volume=1.0, at="flip")
+    result = run_loop(screen, blank(screen), until=timing.now() - 1, on_enter=partial(audio.scheduler.schedule, beep))
+    assert result.frames == 0
+    assert beep.cancelled and beep.started is None
+
+    run_loop(screen, blank(screen), duration=50)
+    assert beep.started is None
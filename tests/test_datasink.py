@@ -0,0 +1,44 @@
+import csv
+import json
+
+import numpy as np
+
+from exptbimanual.exptsys import datasink
+from exptbimanual.exptsys.datasink import DataSink, session_file
+
+
+def test_csv_records_are_written_in_order(tmp_path):
+    sink = DataSink(tmp_path / "trials.csv")
+    for trial in range(3):
+        sink.write({"trial": np.int64(trial), "rt": np.float64(400 + trial), "response": "A"})
+    assert sink.close()
+    assert sink.written == sink.queued == 3
+    with open(sink.path, newline="") as file:
+        rows = list(csv.DictReader(file))
+    assert [row["trial"] for row in rows] == ["0", "1", "2"]
+    assert rows[2]["rt"] == "402.0"
+
+
+def test_jsonl_keeps_varying_keys(tmp_path):
+    sink = DataSink(tmp_path / "trials.jsonl")
+    sink.write({"trial": 0})
+    sink.write({"trial": 1, "extra": [1, 2]})
+    assert sink.close()
+    lines = [json.loads(line) for line in sink.path.read_text().splitlines()]
+    assert lines == [{"trial": 0}, {"trial": 1, "extra": [1, 2]}]
+
+
+def test_unopenable_file_is_reported(tmp_path):
+    sink = DataSink(tmp_path / "missing" / "trials.csv")
+    sink.write({"trial": 0})
+    assert datasink.close_all() == [sink]
+    assert not sink.close()
+    assert sink.written == 0 and sink.queued == 1
+    assert sink.errors and "FileNotFoundError" in sink.errors[0]
+
+
+def test_session_file_never_reuses_a_name(tmp_path):
+    first = session_file(tmp_path, "practice", "7", "1")
+    first.write_text("earlier run")
+    assert first.name == "practice_7_1.csv"
+    assert session_file(tmp_path, "practice", "7", "1").name == "practice_7_1-2.csv"
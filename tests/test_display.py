@@ -0,0 +1,35 @@
+from exptbimanual.exptsys.display import DisplayMode, open_display, probe_refresh
+
+
+def mode(**values) -> DisplayMode:
+    defaults = dict(
+        size=(64, 48),
+        requested="windowed",
+        mode="windowed",
+        fullscreen=False,
+        scaled=False,
+        vsync=False,
+        doublebuf=False,
+        driver="dummy",
+        reported_refresh_hz=None,
+        refresh_interval_ms=0.2,
+        refresh_hz=5000.0,
+        flip_cost_ms=0.0,
+        vsync_effective=False,
+    )
+    return DisplayMode(**(defaults | values))
+
+
+def test_frame_period_prefers_measured_vsync_then_reported_then_probed():
+    assert mode(vsync_effective=True, refresh_interval_ms=16.7, reported_refresh_hz=60).frame_period_ms == 16.7
+    assert mode(reported_refresh_hz=100, probed_refresh_hz=60.0).frame_period_ms == 10.0
+    assert mode(probed_refresh_hz=50.0).frame_period_ms == 20.0
+    # without vsync, the flip rate says nothing about the display
+    assert mode().frame_period_ms is None
+
+
+def test_dummy_driver_has_no_refresh_rate(screen):
+    assert probe_refresh((64, 48), frames=5) is None
+    _, display_mode = open_display((64, 48), measure_frames=5)
+    assert display_mode.driver == "dummy"
+    assert display_mode.frame_period_ms is None
@@ -0,0 +1,65 @@
+import pygame
+import pytest
+
+from exptbimanual.exptsys.media import MediaStore
+
+
+@pytest.fixture
+def images(tmp_path, screen) -> dict[str, str]:
+    paths = {}
+    for i, name in enumerate(["A", "B", "C", "D"]):
+        surface = pygame.Surface((20, 10))
+        surface.fill((i * 60, 0, 0))
+        paths[name] = str(tmp_path / f"{name}.bmp")
+        pygame.image.save(surface, paths[name])
+    return paths
+
+
+def store_for(images: dict[str, str], n_images: int) -> MediaStore:
+    media = MediaStore(use_cache=False)
+    media.register_images(images.values())
+    media.budget_bytes = n_images * MediaStore._nbytes(media["A"])
+    media.evict()
+    return media
+
+
+def test_images_load_on_first_use(images):
+    media = MediaStore(use_cache=False)
+    media.register_images(images.values())
+    assert media.loaded_names() == []
+    assert media.A.get_size() == (20, 10)
+    assert media["A"] is media.A
+    assert media.loaded_names() == ["A"]
+
+
+def test_least_recently_used_images_are_evicted(images):
+    media = store_for(images, 2)
+    media["A"], media["B"]
+    media["A"]  # B is now least recently used
+    media["C"]
+    assert media.loaded_names() == ["A", "C"]
+    assert media.loaded_bytes <= media.budget_bytes
+    # evicted images are simply reloaded
+    assert media["B"].get_size() == (20, 10)
+    assert media.loaded_names() == ["C", "B"]
+
+
+def test_prefetched_images_are_decoded_in_the_background(images):
+    media = MediaStore(use_cache=False)
+    media.register_images(images.values())
+    media.prefetch(["C", "D", "unknown"])
+    assert set(media._pending) == {"C", "D"}
+    assert media["C"].get_size() == (20, 10)
+    assert "C" not in media._pending and media.loaded_names() == ["C"]
+
+
+def test_assigned_media_are_never_evicted(images):
+    media = store_for(images, 1)
+    media.beep = "sound"
+    media["A"], media["B"], media["C"]
+    assert media.beep == "sound"
+    assert "beep" in media.keys() and "beep" in media
+    with pytest.raises(KeyError):
+        media["missing"]
+    with pytest.raises(AttributeError):
+        media.missing
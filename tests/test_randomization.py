@@ -0,0 +1,78 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from exptbimanual.exptsys import randomization
+
+
+def test_participant_seed_is_reproducible():
+    first = randomization.participant_seed("7", "1").random(5)
+    again = randomization.participant_seed("7", "1").random(5)
+    other = randomization.participant_seed("7", "2").random(5)
+    assert np.array_equal(first, again)
+    assert not np.array_equal(first, other)
+
+
+@pytest.mark.parametrize("counts, max_run", [([10, 10], 1), ([12, 6], 2), ([30, 5, 5], 3), ([4, 4, 4, 4], 2)])
+def test_constrained_labels_keep_counts_and_run_limit(counts, max_run):
+    for seed in range(20):
+        sequence = randomization.constrained_labels(counts, max_run, np.random.default_rng(seed))
+        assert np.bincount(sequence, minlength=len(counts)).tolist() == counts
+        assert randomization.max_run_length(sequence) <= max_run
+
+
+def test_constrained_labels_rejects_impossible_counts():
+    with pytest.raises(ValueError):
+        randomization.constrained_labels([7, 2], max_run=2)
+
+
+def test_constrained_order_is_a_valid_permutation():
+    hands = ["both"] * 8 + ["left"] * 4 + ["right"] * 4
+    order = randomization.constrained_order(hands, max_run=2, seed=3)
+    assert sorted(order.tolist()) == list(range(len(hands)))
+    assert randomization.max_run_length([hands[i] for i in order]) <= 2
+    assert np.array_equal(order, randomization.constrained_order(hands, max_run=2, seed=3))
+
+
+@pytest.mark.parametrize("n_conditions, repetitions", [(2, 1), (3, 2), (4, 3)])
+def test_balanced_sequence_counts_every_transition_equally(n_conditions, repetitions):
+    sequence = randomization.balanced_sequence(n_conditions, repetitions, seed=1)
+    assert len(sequence) == n_conditions**2 * repetitions + 1
+    transitions = Counter(zip(sequence[:-1].tolist(), sequence[1:].tolist()))
+    assert transitions == {(i, j): repetitions for i in range(n_conditions) for j in range(n_conditions)}
+
+
+@pytest.mark.parametrize("n", [2, 3, 4, 5, 6])
+def test_latin_square_is_carry_over_balanced(n):
+    square = randomization.latin_square(n)
+    assert square.shape == ((n if n % 2 == 0 else 2 * n), n)
+    for row in square:
+        assert sorted(row.tolist()) == list(range(n))
+    # every condition equally often in every position
+    for column in square.T:
+        assert len(set(Counter(column.tolist()).values())) == 1
+    # every condition immediately follows every other equally often
+    transitions = Counter((a, b) for row in square.tolist() for a, b in zip(row, row[1:]))
+    assert len(transitions) == n * (n - 1)
+    assert len(set(transitions.values())) == 1
+
+
+def test_counterbalanced_row_cycles_through_the_square():
+    square = randomization.latin_square(4)
+    assert np.array_equal(randomization.counterbalanced_row(1, 4), square[1])
+    assert np.array_equal(randomization.counterbalanced_row(5, 4), square[1])
+
+
+def test_precompute_orders_matches_per_participant_generation():
+    def make_order(rng):
+        return rng.permutation(6)
+
+    orders = randomization.precompute_orders(["a", "b"], make_order, seed=9)
+    assert np.array_equal(orders["a"], make_order(randomization.participant_seed("a", seed=9)))
+    assert not np.array_equal(orders["a"], orders["b"])
+
+
+def test_max_run_length():
+    assert randomization.max_run_length([]) == 0
+    assert randomization.max_run_length(list("AABBBA")) == 3
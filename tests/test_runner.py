@@ -0,0 +1,104 @@
+import numpy as np
+
+from exptbimanual.exptsys import response, runner, timing
+from exptbimanual.exptsys.response import InputRecord, InputSource
+from exptbimanual.exptsys.runner import run_loop
+from exptbimanual.exptsys.stimulus import return_partial
+
+
+@return_partial
+def blank(screen) -> dict:
+    return {}
+
+
+def press(key: str = "SPACE"):
+    response.input_events.put(InputRecord(InputSource.keyboard, "test", key, timing.now()))
+
+
+def press_at(clock: timing.VirtualClock, t_ms: float, key: str = "SPACE"):
+    clock.call_at(timing.session_clock.origin_ns + int(t_ms * timing.NS_PER_MS), lambda: press(key))
+
+
+def test_responses_before_onset_are_not_scored(virtual_clock, screen):
+    response.input_events.clear()
+    press()  # before the loop's first flip
+    press_at(virtual_clock, 50)
+    result = run_loop(screen, blank(screen), duration=200, wait_for_responses=1, clear_inputs=False)
+
+    assert len(result.anticipations) == 1
+    assert len(result.responses) == 1
+    assert result.rts == [50.0 - result.onset]
+    assert result.stop < 200
+
+
+def test_anticipations_alone_do_not_end_the_loop(virtual_clock, screen):
+    response.input_events.clear()
+    press()
+    result = run_loop(screen, blank(screen), duration=100, wait_for_responses=1, clear_inputs=False)
+
+    assert result.responses == [] and result.rts == []
+    assert len(result.anticipations) == 1
+    assert result.duration == 100.0
+
+
+def test_loop_that_never_flips_reports_no_rts(virtual_clock, screen):
+    virtual_clock.advance(100)
+    response.input_events.clear()
+    press()
+    result = run_loop(screen, blank(screen), until=timing.now() - 10, clear_inputs=False)
+
+    assert result.frames == 0
+    assert result.rts == [] and result.first_rt is None
+
+
+def test_durations_are_locked_to_frames_when_the_period_is_known(virtual_clock, screen):
+    runner.configure_frame_timing(1000 / 60)
+    try:
+        assert run_loop(screen, blank(screen), duration=100).frames == 6
+        assert run_loop(screen, blank(screen), duration_frames=3).frames == 3
+    finally:
+        runner.configure_frame_timing(None)
+    # unknown period: the duration ends on its own deadline
+    assert run_loop(screen, blank(screen), duration=100).duration == 100.0
+
+
+def test_frame_data_keeps_only_changes_including_arrays(virtual_clock, screen):
+    frames = iter(range(1000))
+
+    @return_partial
+    def changing(screen) -> dict:
+        frame = next(frames)
+        return {"phase": "a" if frame < 2 else "b", "image": np.zeros(3) if frame < 3 else np.ones(3)}
+
+    result = run_loop(screen, changing(screen), duration_frames=5)
+    assert result.frame_data["phase"] == [(0, "a"), (2, "b")]
+    assert [frame for frame, _ in result.frame_data["image"]] == [0, 3]
+    assert np.array_equal(result.values["image"], np.ones(3))
+
+
+def test_hooks_run_once_except_on_frame(virtual_clock, screen):
+    calls = []
+
+    @return_partial
+    def drawing(screen) -> dict:
+        calls.append("draw")
+        return {}
+
+    result = run_loop(
+        screen,
+        drawing(screen),
+        duration_frames=3,
+        on_enter=lambda: calls.append("enter"),
+        on_first_flip=lambda onset: calls.append(("first_flip", onset)),
+        on_frame=lambda index: calls.append(("frame", index)),
+        on_exit=lambda result: calls.append(("exit", result.frames)),
+    )
+    assert calls[0] == "enter" and calls[1] == "draw"
+    assert [call for call in calls if call != "draw"] == [
+        "enter",
+        ("first_flip", result.onset),
+        ("frame", 0),
+        ("frame", 1),
+        ("frame", 2),
+        ("exit", 3),
+    ]
@@ -0,0 +1,90 @@
+import pygame
+
+from exptbimanual.exptsys import audio, response, timing
+from exptbimanual.exptsys.response import InputRecord, InputSource
+from exptbimanual.exptsys.scheduler import FrameScheduler
+from exptbimanual.exptsys.stimulus import return_partial
+
+
+@return_partial
+def fill(screen: pygame.Surface, color: str, rect: tuple = (0, 0, 64, 48)) -> dict:
+    screen.fill(color, rect)
+    return {}
+
+
+def press_at(clock: timing.VirtualClock, t_ms: float, key: str):
+    def press():
+        response.input_events.put(InputRecord(InputSource.keyboard, "test", key, timing.now()))
+
+    clock.call_at(timing.session_clock.origin_ns + int(t_ms * timing.NS_PER_MS), press)
+
+
+def test_present_returns_the_onset_and_layers_draw_in_order(virtual_clock, screen):
+    async def trial(s: FrameScheduler):
+        s.show(fill(screen, "red"), layer="background")
+        onset = await s.present(fill(screen, "blue", (0, 0, 8, 8)))
+        await s.wait(100)
+        return onset
+
+    scheduler = FrameScheduler(screen, refresh_rate=50)
+    onset = scheduler.run(trial)
+    assert onset == 0.0
+    assert scheduler.frames == 5  # frames at 0, 20, ..., 80 ms, the wait ends before the next one
+    assert tuple(screen.get_at((0, 0)))[:3] == (0, 0, 255)
+    assert tuple(screen.get_at((20, 20)))[:3] == (255, 0, 0)
+
+
+def test_waits_fire_at_their_own_time_between_frames(virtual_clock, screen):
+    async def trial(s: FrameScheduler):
+        await s.frame()
+        return await s.wait(25)
+
+    assert FrameScheduler(screen, refresh_rate=50).run(trial) == 25.0
+
+
+def test_spawned_tasks_run_alongside_and_are_cancelled_at_the_end(virtual_clock, screen):
+    events = []
+
+    async def ticker(s: FrameScheduler):
+        while True:
+            events.append(await s.wait(30))
+
+    async def trial(s: FrameScheduler):
+        task = s.spawn(ticker(s))
+        await s.wait(100)
+        return task
+
+    task = FrameScheduler(screen).run(trial)
+    assert events == [30.0, 60.0, 90.0]
+    assert task.cancelled()
+
+
+def test_response_waits_filter_and_time_out(virtual_clock, screen):
+    press_at(virtual_clock, 10, "X")
+    press_at(virtual_clock, 40, "A")
+    press_at(virtual_clock, 70, "K")
+
+    async def trial(s: FrameScheduler):
+        both = s.wait_for_responses(2, allowed=["A", "K"])
+        first = await s.wait_for_responses(1, allowed=["A", "K"], timeout_ms=20)
+        return first, await both
+
+    first, both = FrameScheduler(screen).run(trial)
+    assert first == []
+    assert [(r.value, r.time) for r in both] == [("A", 40.0), ("K", 70.0)]
+
+
+def test_play_resolves_when_the_sound_ends(virtual_clock, screen):
+    audio.configure_mixer(buffer=256)
+    pygame.mixer.init()
+    try:
+
+        async def trial(s: FrameScheduler):
+            return await s.play(audio.tone(440, 50), label="tone")
+
+        record = FrameScheduler(screen).run(trial)
+        assert record.label == "tone" and record.started == 0.0
+        # noticed on the first frame after the sound's end
+        assert 50 <= record.finished <= 50 + 2 * 1000 / 60
+    finally:
+        pygame.mixer.quit()
@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def run_session(directory: Path, subid: str = "t1", session: str = "1", seed: int = 3) -> subprocess.CompletedProcess:
+    """
+    A whole task_schedule.run in simulated time, as the CLI runs it (main() exits the process).
+    """
+    env = os.environ | {"PYTHONPATH": str(ROOT)}
+    return subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "exptbimanual.main",
+            "--headless",
+            "--virtual-clock",
+            "--subid",
+            subid,
+            "--session",
+            session,
+            "--seed",
+            str(seed),
+        ],
+        cwd=directory,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+
+@pytest.fixture(scope="module")
+def session_dir(tmp_path_factory) -> Path:
+    directory = tmp_path_factory.mktemp("session")
+    completed = run_session(directory)
+    assert completed.returncode == 0, completed.stdout + completed.stderr
+    assert "Simulated" in completed.stdout
+    return directory / "data"
+
+
+def test_session_writes_every_practice_trial(session_dir):
+    trials = pd.read_csv(session_dir / "practice_t1_1.csv")
+    assert len(trials) == 8
+    assert trials["trial"].tolist() == list(range(8))
+    assert trials["response"].notna().all()
+    assert (trials["rt"] > 0).all()
+    assert set(trials["correct"]) <= {True, False}
+
+
+def test_session_records_beep_onsets_and_settings(session_dir):
+    settings = json.loads((session_dir / "session_t1_1.json").read_text())
+    assert settings["subid"] == "t1"
+    assert settings["display_mode"]["driver"] == "dummy"
+    latency = settings["audio"]["buffer_latency_ms"]
+
+    trials = pd.read_csv(session_dir / "practice_t1_1.csv")
+    assert (trials["beep_started"] == trials["feedback_onset"]).all()
+    assert (trials["beep_onset"] - trials["beep_started"]).round(6).eq(round(latency, 6)).all()
+
+
+def test_session_timeline_has_no_drift(session_dir):
+    timeline = pd.read_csv(session_dir / "practice_t1_1_timeline.csv")
+    assert len(timeline) == 3 * 8
+    assert timeline["name"].tolist()[:3] == ["fixation", "practice_screen", "feedback"]
+    assert timeline["drift"].abs().max() == 0
+
+
+def test_rerun_is_deterministic_and_keeps_earlier_data(session_dir, tmp_path):
+    # the same participant and seed run twice in one folder: the second run gets its own file, with the same data
+    for _ in range(2):
+        assert run_session(tmp_path).returncode == 0
+    first = (session_dir / "practice_t1_1.csv").read_text()
+    assert (tmp_path / "data" / "practice_t1_1.csv").read_text() == first
+    assert (tmp_path / "data" / "practice_t1_1-2.csv").read_text() == first
@@ -0,0 +1,52 @@
+import pygame
+
+from exptbimanual.exptsys.runner import run_loop
+from exptbimanual.exptsys.stimulus import draw_image, record_display, return_partial
+
+
+def square(color: str, size: int = 8) -> pygame.Surface:
+    surface = pygame.Surface((size, size))
+    surface.fill(color)
+    return surface
+
+
+@return_partial
+def two_squares(screen: pygame.Surface, left: pygame.Surface, right: pygame.Surface) -> dict:
+    draw_image(screen, left, (16, 24))
+    draw_image(screen, right, (48, 24))
+    return {"shown": "squares"}
+
+
+@return_partial
+def filled(screen: pygame.Surface) -> dict:
+    screen.fill("red")
+    return {"shown": "fill"}
+
+
+def test_recorded_display_replays_the_same_pixels(screen):
+    left, right = square("red"), square("blue")
+    two_squares(screen, left, right)()
+    expected = pygame.image.tobytes(screen, "RGB")
+
+    screen.fill("black")
+    display_list = record_display(two_squares(screen=screen, left=left, right=right))
+    assert display_list is not None
+    assert len(display_list.items) == 2 and display_list.result == {"shown": "squares"}
+    # recording doesn't draw
+    assert pygame.image.tobytes(screen, "RGB") != expected
+
+    display_list.replay(screen)
+    assert pygame.image.tobytes(screen, "RGB") == expected
+
+
+def test_displays_that_do_more_than_blit_are_not_recorded(screen):
+    assert record_display(filled(screen)) is None
+
+
+def test_run_loop_falls_back_to_calling_unrecordable_displays(virtual_clock, screen):
+    result = run_loop(screen, filled(screen), duration_frames=2, fill_color="black", record=True)
+    assert result.values == {"shown": "fill"}
+    assert tuple(screen.get_at((0, 0)))[:3] == (255, 0, 0)
+
+    result = run_loop(screen, two_squares(screen, square("red"), square("blue")), duration_frames=2, record=True)
+    assert result.frame_data == {"shown": [(0, "squares")]}
@@ -0,0 +1,83 @@
+import pytest
+
+from exptbimanual.exptsys import response, timing
+from exptbimanual.exptsys.response import InputRecord, InputSource
+from exptbimanual.exptsys.stimulus import return_partial
+from exptbimanual.exptsys.timeline import Timeline
+
+
+@return_partial
+def blank(screen) -> dict:
+    return {}
+
+
+def respond_at(clock: timing.VirtualClock, t_ms: float):
+    def respond():
+        response.input_events.put(InputRecord(InputSource.keyboard, "test", "SPACE", timing.now()))
+
+    clock.call_at(timing.session_clock.origin_ns + int(t_ms * timing.NS_PER_MS), respond)
+
+
+def test_planned_onsets_run_up_to_the_first_open_ended_phase():
+    timeline = Timeline([("a", 100), ("b", 200), ("c", None), ("d", 50)])
+    assert [phase.planned_onset for phase in timeline.phases] == [0.0, 100.0, 300.0, None]
+    assert timeline.phases[1].planned_end == 300.0
+    assert timeline.phases[2].planned_end is None
+
+
+def test_absolute_timeline_absorbs_setup_overhead(virtual_clock, screen):
+    timeline = Timeline([("a", 100), ("b", 200), ("c", 300)], absolute=True)
+    timeline.start()
+    for name in ("a", "b", "c"):
+        timeline.run(name, screen, blank(screen))
+        virtual_clock.advance(7)  # setup between phases
+
+    assert [phase.end for phase in timeline.phases] == [100.0, 300.0, 600.0]
+    assert [phase.drift for phase in timeline.phases] == [0.0, 7.0, 7.0]
+    summary = timeline.summary()
+    assert summary["actual_ms"] == summary["planned_ms"] == 600.0
+
+
+def test_relative_timeline_accumulates_setup_overhead(virtual_clock, screen):
+    timeline = Timeline([("a", 100), ("b", 200), ("c", 300)], absolute=False)
+    timeline.start()
+    for name in ("a", "b", "c"):
+        timeline.run(name, screen, blank(screen))
+        virtual_clock.advance(7)
+
+    assert [phase.drift for phase in timeline.phases] == [0.0, 7.0, 14.0]
+    assert timeline.summary()["actual_ms"] == 614.0
+
+
+def test_open_ended_phase_reanchors_the_plan(virtual_clock, screen):
+    timeline = Timeline([("fixation", 100), ("stimulus", None), ("feedback", 200)])
+    timeline.start()
+    timeline.run("fixation", screen, blank(screen))
+    respond_at(virtual_clock, 420)
+    result = timeline.run("stimulus", screen, blank(screen), wait_for_responses=1)
+
+    assert len(result.responses) == 1
+    stimulus_end = timeline.phases[1].end
+    assert stimulus_end >= 420
+    assert timeline.phases[2].planned_onset == stimulus_end
+
+    timeline.run("feedback", screen, blank(screen))
+    assert timeline.phases[2].end == pytest.approx(stimulus_end + 200)
+
+
+def test_phases_must_run_in_order(virtual_clock, screen):
+    timeline = Timeline([("a", 100), ("b", 100)])
+    with pytest.raises(ValueError):
+        timeline.run("b", screen, blank(screen))
+    timeline.run("a", screen, blank(screen))
+    timeline.run("b", screen, blank(screen))
+    with pytest.raises(IndexError):
+        timeline.run("a", screen, blank(screen))
+
+
+def test_to_frame_has_one_row_per_phase(virtual_clock, screen):
+    timeline = Timeline([("a", 100), ("b", 50)])
+    timeline.run("a", screen, blank(screen))
+    frame = timeline.to_frame()
+    assert frame["name"].tolist() == ["a", "b"]
+    assert {"planned_onset", "onset", "end", "planned_end", "drift"} <= set(frame.columns)
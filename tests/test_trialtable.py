@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from exptbimanual.exptsys.trialtable import compile_design
+
+CONDITIONS = {
+    "left": ["FF1BW", "FF2BW", "FF1BW"],
+    "right": ["HH1BW", "HH1BW", "HH2BW"],
+    "correct_keys": ["A K", "S", "L"],
+}
+
+
+def test_compile_design_crosses_factors_and_repetitions():
+    trials = compile_design(CONDITIONS, ["left", "right"], factors={"soa": [0, 100]}, repetitions=2)
+    assert len(trials) == 3 * 2 * 2
+    assert trials.column("trial").tolist() == list(range(12))
+    assert trials.column("repetition").tolist() == [0] * 6 + [1] * 6
+    # conditions in order, last factor varies fastest
+    assert trials.column("condition").tolist()[:6] == [0, 0, 1, 1, 2, 2]
+    assert trials.column("soa").tolist()[:6] == [0, 100] * 3
+
+
+def test_stimulus_columns_are_indices_into_media_names():
+    trials = compile_design(CONDITIONS, ["left", "right"])
+    assert sorted(trials.media_names) == ["FF1BW", "FF2BW", "HH1BW", "HH2BW"]
+    assert np.issubdtype(trials.column("left").dtype, np.integer)
+    assert [trials.media("left", i) for i in range(3)] == CONDITIONS["left"]
+    assert [trials.media("right", i) for i in range(3)] == CONDITIONS["right"]
+
+
+def test_order_is_applied_before_trial_numbers():
+    trials = compile_design(CONDITIONS, ["left", "right"], order=[2, 0, 1])
+    assert trials.column("condition").tolist() == [2, 0, 1]
+    assert trials.column("trial").tolist() == [0, 1, 2]
+
+    reversed_trials = compile_design(CONDITIONS, ["left", "right"], order=lambda design: design.index[::-1])
+    assert reversed_trials.column("condition").tolist() == [2, 1, 0]
+
+
+def test_record_row_and_save(tmp_path):
+    trials = compile_design(CONDITIONS, ["left", "right"])
+    trials.record(0, response="A K", correct=True, rt=412.5)
+    trials.record(2, response="K", correct=False, rt=390.0)
+
+    assert trials.column("rt")[0] == 412.5
+    assert np.isnan(trials.column("rt")[1])
+    assert trials.column("correct").tolist() == [True, None, False]
+
+    row = trials.row(0)
+    assert row["left"] == "FF1BW" and row["right"] == "HH1BW"
+    assert row["response"] == "A K" and row["correct"] is True
+
+    path = tmp_path / "trials.csv"
+    trials.save(path)
+    saved = pd.read_csv(path)
+    assert saved["left"].tolist() == CONDITIONS["left"]
+    assert saved["rt"].tolist()[::2] == [412.5, 390.0]
+    assert list(saved.columns) == list(trials.to_frame().columns)